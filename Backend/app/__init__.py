@@ -1,15 +1,25 @@
 # Standard library imports
+from contextlib import asynccontextmanager
 
 # Third-party imports
 from fastapi import FastAPI 
+from fastapi.responses import ORJSONResponse
 from starlette.middleware.cors import CORSMiddleware 
 
 # Local application imports
+from ia import flush_pending_saves
 
 from routes import epic_ai_router, req_ai_router, app_router,knowledge_ai_router,user_ai_router   #<-- Futuras rutas de la API
 
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Los historiales con guardado agrupado pendiente se escriben antes de salir
+    await flush_pending_saves()
+
+
 def create_app() -> FastAPI:
     """
     Crea e inicializa una nueva instancia de la aplicación FastAPI.
@@ -19,7 +29,8 @@ def create_app() -> FastAPI:
     """
     print("Creando la aplicación FastAPI...")
 
-    app = FastAPI(title="RAICES API", version="1.0.0")
+    # Las respuestas se serializan con orjson en lugar de json.dumps
+    app = FastAPI(title="RAICES API", version="1.0.0", default_response_class=ORJSONResponse, lifespan=lifespan)
     
     # Configuración del middleware CORS
     app.add_middleware(
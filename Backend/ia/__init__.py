@@ -1,2 +1,4 @@
+# shared_config va primero: carga el .env antes de que .assistant lea la configuración
+from .shared_config import get_shared_llm, get_assistant
 from .assistant import Assistant
-from .shared_config import shared_llm, shared_conversation_manager
+from .conversation_manager import flush_pending_saves
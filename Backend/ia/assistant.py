@@ -25,7 +25,6 @@ Notas:
 # ────────────────────────────────
 # Librerías estándar / Standard libraries
 import os
-import dotenv
 
 # ────────────────────────────────
 # Librerías de terceros / Third-party libraries
@@ -40,10 +39,10 @@ from .content_generator import ContentGenerator
 from .thinking_steps import ThinkingSteps 
 
 
-# Claves de entorno para configuración del LLM y embeddings
-dotenv.load_dotenv()
+# Claves de entorno para configuración del LLM y embeddings (el .env lo carga shared_config)
 Key = os.environ.get("GEMINI_API_KEY")
 Embedding = os.environ.get("EMBEDDING")
+VectorstoreBackend = os.environ.get("VECTORSTORE_BACKEND", "chroma")
 
 
 class Assistant:
@@ -83,7 +82,8 @@ class Assistant:
             filter_directories:str = None,
             thinking_callback:str = None,
             llm = None,
-            conversation_manager=None
+            conversation_manager=None,
+            vectorstore_backend:str = VectorstoreBackend
         ):
 
         """
@@ -97,6 +97,7 @@ class Assistant:
             persist_directory (str): Carpeta donde se guardan los vectores / Vector storage directory
             filter_directories (str): Filtros opcionales por subdirectorios / Optional subdirectory filters
             thinking_callback (str): Función para simular pasos mentales / Optional callback for thought simulation
+            vectorstore_backend (str): Motor de vectores, "chroma" o "faiss" / Vector backend, "chroma" or "faiss"
         """
         self.llm = llm if llm else ChatGoogleGenerativeAI(
             api_key=Key,
@@ -119,25 +120,22 @@ class Assistant:
             pdf_directory= os.path.join(os.path.dirname(__file__), 'pdfs', subdirectory),
             persist_directory=persist_directory,
             embedding= embedding_model,
-            filter_directories=filter_directories
+            filter_directories=filter_directories,
+            vectorstore_backend=vectorstore_backend
         )
 
-        if conversation_manager:
+        # Controlador del historial de conversación. Uno recibido sin document_manager (el compartido)
+        # no puede construir retrievers para este asistente, así que se crea uno propio.
+        # Conversation history handler. One received without a document_manager (the shared one)
+        # cannot build retrievers for this assistant, so a dedicated one is created.
+        if conversation_manager is not None and conversation_manager.document_manager is not None:
             self.conversation_manager = conversation_manager
         else:
             self.conversation_manager = ConversationManager(
-                document_manager=self.document_manager,
-                llm=self.llm
+                document_manager= self.document_manager,
+                llm = self.llm
             )
 
-
-        # Controlador del historial de conversación
-        # Conversation history handler
-        self.conversation_manager = ConversationManager(
-            document_manager= self.document_manager,
-            llm = self.llm
-        )
-
         # Simula pensamiento paso a paso para mejor UX
         # Simulates step-by-step reasoning (for better UX)
         self.thinking_manager = ThinkingSteps(
@@ -193,7 +191,7 @@ class Assistant:
         
         # Procesa y normaliza la salida del modelo
         # Process and standardize model response
-        standardized_answer = self.llm_response_manager.process_llm_response(response,query)
+        standardized_answer = self.llm_response_manager.process_llm_response(response,query,output_type=type)
         
         # Actualiza el historial de conversación con la nueva interacción
         # Update conversation history with this interaction
@@ -202,3 +200,37 @@ class Assistant:
         await self.thinking_manager.complete()
 
         return standardized_answer
+
+    async def stream_content(self, query, preprompt, type, session_id=None, newchat=False):
+        """
+        Igual que generate_content, pero emite cada elemento generado en cuanto el modelo lo completa.
+
+        Same as generate_content, but yields each generated item as soon as the model completes it.
+
+        Yields:
+            tuple: ("item", modelo Pydantic del elemento / item Pydantic model) por cada elemento,
+                   y al final ("done", respuesta estandarizada / standardized response string)
+        """
+        session_id = self.content_generator._manage_session(session_id, newchat)
+        retriever = self.content_generator._configure_retriever(session_id, newchat)
+        qa_prompt = self.content_generator._prepare_prompt(query, preprompt, session_id, newchat,type=type)
+
+        answer_parts = []
+
+        async def collect_chunks():
+            async for chunk in self.content_generator._stream_rag_chain(query, retriever, qa_prompt):
+                answer_parts.append(chunk)
+                yield chunk
+
+        async for item in self.llm_response_manager.stream_items(collect_chunks(), type):
+            yield "item", item
+
+        # La respuesta completa pasa por el mismo procesamiento que generate_content
+        # The full answer goes through the same processing as generate_content
+        standardized_answer = self.llm_response_manager.process_llm_response(
+            {"answer": "".join(answer_parts)},
+            query,
+            output_type=type
+        )
+
+        yield "done", standardized_answer
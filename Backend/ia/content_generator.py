@@ -24,7 +24,6 @@ from datetime import datetime
 
 # ────────────────────────────────
 # Librerías de terceros / Third-party libraries
-from langchain_core.output_parsers import JsonOutputParser
 from langchain.chains.history_aware_retriever import create_history_aware_retriever
 from langchain.chains.retrieval import create_retrieval_chain 
 from langchain.chains.combine_documents import create_stuff_documents_chain
@@ -34,9 +33,27 @@ from langchain.prompts import PromptTemplate, MessagesPlaceholder
 
 # ────────────────────────────────
 # Imports locales / Local imports
-from models import RequirementResponse
-from models import EpicResponse
-from models import UserStoryResponse
+from models import RequirementResponse, REQUIREMENT_FORMAT_INSTRUCTIONS
+from models import EpicResponse, EPIC_FORMAT_INSTRUCTIONS
+from models import UserStoryResponse, USER_STORY_FORMAT_INSTRUCTIONS
+
+
+def _escape_braces(text):
+    """
+    Duplica las llaves para que ChatPromptTemplate no las trate como variables.
+
+    Doubles braces so ChatPromptTemplate does not treat them as variables.
+    """
+    return text.replace('{', '{{').replace('}', '}}')
+
+
+# Instrucciones de formato ya escapadas para ChatPromptTemplate, por tipo de salida
+# Format instructions already escaped for ChatPromptTemplate, by output type
+_ESCAPED_FORMAT_INSTRUCTIONS = {
+    "requerimientos": _escape_braces(REQUIREMENT_FORMAT_INSTRUCTIONS),
+    "epicas": _escape_braces(EPIC_FORMAT_INSTRUCTIONS),
+    "historias_usuario": _escape_braces(USER_STORY_FORMAT_INSTRUCTIONS)
+}
 
 class ContentGenerator:
     """
@@ -117,16 +134,13 @@ class ContentGenerator:
             session_id: ID de la sesión activa / Active session ID
             newchat: Indicador de si es una conversación nueva / Flag to indicate if it's a new chat
         """
-        if type == "requerimientos":
-            parser = JsonOutputParser(pydantic_object=RequirementResponse)
-        elif type == "epicas":
-            parser = JsonOutputParser(pydantic_object=EpicResponse)
-        elif type == "historias_usuario":
-            parser = JsonOutputParser(pydantic_object=UserStoryResponse)
-        else:
-            parser = JsonOutputParser(pydantic_object=RequirementResponse)
+        format_instructions = _ESCAPED_FORMAT_INSTRUCTIONS.get(type, _ESCAPED_FORMAT_INSTRUCTIONS["requerimientos"])
 
-        format_instructions = parser.get_format_instructions()
+        # El contexto recuperado cambia en cada consulta: va en el último turno para que el mensaje
+        # del sistema y el historial formen un prefijo idéntico entre turnos (cache de prefijo del proveedor)
+        # Retrieved context changes on every query: it goes in the last turn so the system message
+        # and history form an identical prefix across turns (provider prefix cache)
+        human_message = f"Información de referencia:\n\n{{context}}\n\nPregunta: {query}"
 
         system_message = self._create_system_message(preprompt, format_instructions, type)
         
@@ -137,13 +151,13 @@ class ContentGenerator:
             return ChatPromptTemplate.from_messages([
                 ("system", system_message),
                 *history_messages,
-                ("human", f"Pregunta: {query}")
+                ("human", human_message)
             ])
         
         else:
             return ChatPromptTemplate.from_messages([
                 ("system", system_message),
-                ("human", f"Pregunta: {query}")
+                ("human", human_message)
             ])
 
     
@@ -155,17 +169,15 @@ class ContentGenerator:
 
         Args:
             preprompt: Introducción base / Base instructions
-            format_instructions: Instrucciones generadas por el parser JSON / JSON format instructions
+            format_instructions: Instrucciones del parser JSON, ya escapadas / JSON parser instructions, already escaped
         """
 
-        escaped_format_instructions = format_instructions.replace('{', '{{').replace('}', '}}')
-
         if type == "requerimientos":
             return (
                 f"{preprompt} Use the following information to deepen and enrich your response  ALWAYS RESPOND IN THE LANGUAGE THE USER TALKED TO YOU"
-                "or as a base to build your answer: \n\n{context}\n\n"
+                "or as a base to build your answer; it is provided along with the question.\n\n"
                 "Generate your response in the following structured JSON format. Always make sure to include the '{{status}}' field:\n\n"
-                f"{escaped_format_instructions}\n\n"
+                f"{format_instructions}\n\n"
                 "IMPORTANT: The '{{status}}' field is MANDATORY and must be one of the following values:\n"
                 "- 'REQUERIMIENTOS_GENERADOS' if you can generate requirements based on the project description. Always use the fields id (REQ-### for functional and REQ-NF-### for non-functional), title, description, category (functional or non-functional depending on the type), and priority (High, Medium, Low)\n"
                 "- 'INFORMACION_INSUFICIENTE' if you believe more information is needed, and list it under the 'missing_info' field\n"
@@ -179,9 +191,9 @@ class ContentGenerator:
         elif type == "epicas":
             return (
                 f"{preprompt} Use the following information to deepen and enrich your response ALWAYS RESPOND IN THE LANGUAGE THE USER TALKED TO YOU "
-                "or as a base to build your answer: \n\n{context}\n\n"
+                "or as a base to build your answer; it is provided along with the question.\n\n"
                 "Generate your response in the following structured JSON format. Always make sure to include the '{{status}}' field:\n\n"
-                f"{escaped_format_instructions}\n\n"
+                f"{format_instructions}\n\n"
                 "IMPORTANT: The '{{status}}' field is MANDATORY and must be one of the following values:\n"
                 "- 'EPICAS_GENERADAS' if you can generate epics based on the available requirements. Always use the fields id (EPIC-###), title, description, and related_requirements, where you list the requirement IDs (REQ-### for functional and REQ-NF-### for non-functional) along with their descriptions in a list\n"
                 "- 'INFORMACION_INSUFICIENTE' if you believe more information is needed, and list it under the 'missing_info' field\n"
@@ -195,9 +207,9 @@ class ContentGenerator:
         elif type == "historias_usuario":
             return (
                 f"{preprompt} Use the following information to deepen and enrich your response  ALWAYS RESPOND IN THE LANGUAGE THE USER TALKED TO YOU"
-                "or as a base to build your answer: \n\n{context}\n\n"
+                "or as a base to build your answer; it is provided along with the question.\n\n"
                 "Generate your response in the following structured JSON format. Always make sure to include the '{{status}}' field:\n\n"
-                f"{escaped_format_instructions}\n\n"
+                f"{format_instructions}\n\n"
                 "IMPORTANT: The '{{status}}' field is MANDATORY and must be one of the following values:\n"
                 "- 'HISTORIAS_GENERADAS' if you can generate user stories based on the available epics. Always use the fields id (US-###), title, description, priority (High, Medium, Low), and assigned_epic (EPIC-###) for the associated epic. Also include the acceptance_criteria field as a list of acceptance criteria for the user story\n"
                 "- 'INFORMACION_INSUFICIENTE' if you believe more information is needed, and list it under the 'missing_info' field\n"
@@ -211,9 +223,9 @@ class ContentGenerator:
         else:
             return (
                 f"{preprompt} Use the following information to deepen and enrich your response ALWAYS RESPOND IN THE LANGUAGE THE USER TALKED TO YOU"
-                "or as a base to build your answer: \n\n{context}\n\n"
+                "or as a base to build your answer; it is provided along with the question.\n\n"
                 "Generate your response in the following structured JSON format. Always make sure to include the '{{status}}' field:\n\n"
-                f"{escaped_format_instructions}\n\n"
+                f"{format_instructions}\n\n"
                 "IMPORTANT: The '{{status}}' field is MANDATORY and must be one of the following values:\n"
                 "- 'REQUERIMIENTOS_GENERADOS' if you can generate requirements based on the project description. Always use the fields id (REQ-### for functional and REQ-NF-### for non-functional), title, description, category (functional or non-functional depending on the type), and priority (High, Medium, Low)\n"
                 "- 'INSUFFICIENT_INFORMATION' if you believe more information is needed, and list it under the 'missing_info' field\n"
@@ -232,7 +244,7 @@ class ContentGenerator:
                 f"{preprompt} Utiliza la información siguiente para profundizar y enriquecer tu respuesta "
                 "o como una base para construir lo que se te pide: \n\n{context}\n\n" 
                 "Genera tu respuesta en el siguiente formato estructurado JSON. Asegúrate de incluir SIEMPRE el campo '{{status}}':\n\n" 
-                f"{escaped_format_instructions}\n\n"
+                f"{format_instructions}\n\n"
                 "IMPORTANTE: El campo '{{status}}' es OBLIGATORIO y debe ser uno de estos valores:\n"
                 "- 'REQUERIMIENTOS_GENERADOS si puedes generar requerimientos en base a la descripcion del proyecto si es posible, no olvides que SIEMPRE debes usar los campos id (REQ-###) para funcionales y REQ-NF-### para no funcionales, title,description,category(funcional o no funcional segun el tipo de requerimiento) y priority (Alta, Media, Baja)'\n"
                 "- 'INFORMACION_INSUFICIENTE cuando consideres que falta informacion, y listala dentro del campo missing_info'\n"
@@ -248,7 +260,7 @@ class ContentGenerator:
                 f"{preprompt} Utiliza la información siguiente para profundizar y enriquecer tu respuesta "
                 "o como una base para construir lo que se te pide: \n\n{context}\n\n" 
                 "Genera tu respuesta en el siguiente formato estructurado JSON. Asegúrate de incluir SIEMPRE el campo '{{status}}':\n\n" 
-                f"{escaped_format_instructions}\n\n"
+                f"{format_instructions}\n\n"
                 "IMPORTANTE: El campo '{{status}}' es OBLIGATORIO y debe ser uno de estos valores:\n"
                 "- 'EPICAS_GENERADAS si puedes generar epicas en base a los requerimientos que tienes si es posible, no olvides que SIEMPRE debes usar los campos id en formato obligatorio (EPIC-###) title,description, y related_requirements donde pondras el id del requerimiento con formato REQ-### para funcionales y REQ-NF-### para no funcionales y su descripcion como lista'\n"
                 "- 'INFORMACION_INSUFICIENTE cuando consideres que falta informacion, y listala dentro del campo missing_info'\n"
@@ -264,7 +276,7 @@ class ContentGenerator:
                 f"{preprompt} Utiliza la información siguiente para profundizar y enriquecer tu respuesta "
                 "o como una base para construir lo que se te pide: \n\n{context}\n\n" 
                 "Genera tu respuesta en el siguiente formato estructurado JSON. Asegúrate de incluir SIEMPRE el campo '{{status}}':\n\n" 
-                f"{escaped_format_instructions}\n\n"
+                f"{format_instructions}\n\n"
                 "IMPORTANTE: El campo '{{status}}' es OBLIGATORIO y debe ser uno de estos valores:\n"
                 "- 'HISTORIAS_GENERADAS si puedes generar epicas en base a los requerimientos que tienes si es posible, no olvides que SIEMPRE debes usar los campos id en formato obligatorio (US-###) title, description,priority(Alta,Media,Baja), y assigned_epic donde pondras el id del la EPICA con formato EPIC-### para la epica asociada a la Historia de usuario, igualmente agrega el campo acceptance_criteria como una lista de criterios de aceptacion para la historia de usuario'\n"
                 "- 'INFORMACION_INSUFICIENTE cuando consideres que falta informacion, y listala dentro del campo missing_info'\n"
@@ -280,7 +292,7 @@ class ContentGenerator:
                 f"{preprompt} Utiliza la información siguiente para profundizar y enriquecer tu respuesta "
                 "o como una base para construir lo que se te pide: \n\n{context}\n\n" 
                 "Genera tu respuesta en el siguiente formato estructurado JSON. Asegúrate de incluir SIEMPRE el campo '{{status}}':\n\n" 
-                f"{escaped_format_instructions}\n\n"
+                f"{format_instructions}\n\n"
                 "IMPORTANTE: El campo '{{status}}' es OBLIGATORIO y debe ser uno de estos valores:\n"
                 "- 'REQUERIMIENTOS_GENERADOS si puedes generar requerimientos en base a la descripcion del proyecto si es posible, no olvides que SIEMPRE debes usar los campos id (REQ-###) para funcionales y REQ-NF-### para no funcionales, title,description,category(funcional o no funcional segun el tipo de requerimiento) y priority (Alta, Media, Baja)'\n"
                 "- 'INFORMACION_INSUFICIENTE cuando consideres que falta informacion, y listala dentro del campo missing_info'\n"
@@ -309,7 +321,7 @@ class ContentGenerator:
         question_answer_chain = create_stuff_documents_chain(self.llm, qa_prompt)
         rag_chain = create_retrieval_chain(retriever, question_answer_chain)
         
-        result = rag_chain.invoke({
+        result = await rag_chain.ainvoke({
             "input": query, 
             "\"description\"": "",
             "\"properties\"": "",
@@ -320,6 +332,30 @@ class ContentGenerator:
         await self.thinking_manager.add_step("Sintetizando respuesta basada en el conocimiento disponible", 1.5)
 
         return result
+
+    async def _stream_rag_chain(self, query, retriever, qa_prompt):
+        """
+        Ejecuta la cadena RAG en modo streaming y emite los fragmentos de la respuesta conforme llegan.
+
+        Runs the RAG chain in streaming mode and yields the answer chunks as they arrive.
+
+        Args:
+            query: Consulta original / Original query
+            retriever: Sistema de recuperación de documentos / Document retriever
+            qa_prompt: Prompt final para el modelo / Final prompt to be passed to the LLM
+        """
+        question_answer_chain = create_stuff_documents_chain(self.llm, qa_prompt)
+        rag_chain = create_retrieval_chain(retriever, question_answer_chain)
+
+        async for part in rag_chain.astream({
+            "input": query,
+            "\"description\"": "",
+            "\"properties\"": "",
+            "\"foo\"": ""
+        }):
+            answer = part.get("answer")
+            if answer:
+                yield answer
     
     def _update_conversation_history(self, session_id, query, standardized_answer, response,final_response=None):
         """
@@ -338,7 +374,7 @@ class ContentGenerator:
 
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
-        self.conversation_manager.conversations[session_id]["history"].append({
+        self.conversation_manager.get_history_list(session_id).append({
             "query": query,
             "response": response_to_save,
             "timestamp": timestamp,
@@ -19,6 +19,10 @@ Versión / Version: 1.0.0
 # Librerías estándar / Standard libraries
 import uuid
 import os
+import asyncio
+import json
+import threading
+from collections import defaultdict
 from datetime import datetime
 
 # ────────────────────────────────
@@ -27,6 +31,76 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain.chains.history_aware_retriever import create_history_aware_retriever
 from langchain_google_genai import ChatGoogleGenerativeAI
 
+# Historial compacto por defecto; HISTORY_JSON_INDENT=1 lo deja legible para depurar
+# Compact history by default; HISTORY_JSON_INDENT=1 keeps it readable for debugging
+HISTORY_JSON_INDENT = os.environ.get("HISTORY_JSON_INDENT", "0") == "1"
+
+try:
+    import orjson
+
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if HISTORY_JSON_INDENT else 0)
+
+    def _json_dumps(data):
+        return orjson.dumps(data, option=_ORJSON_OPTIONS).decode()
+except ImportError:
+    def _json_dumps(data):
+        return json.dumps(data, ensure_ascii=False, indent=2 if HISTORY_JSON_INDENT else None)
+
+
+# Ventana en segundos para agrupar varios guardados seguidos de una sesión en una sola escritura
+# Window in seconds to coalesce several back-to-back saves of a session into a single write
+HISTORY_SAVE_DEBOUNCE = float(os.environ.get("HISTORY_SAVE_DEBOUNCE", 1.0))
+
+# Guardados programados que aún esperan la ventana: (manager, session_id) -> tarea
+# Scheduled saves still waiting for the window: (manager, session_id) -> task
+_PENDING_SAVES = {}
+
+# Guardados que ya pasaron la ventana y están escribiendo: (manager, session_id) -> {tareas}
+# Saves past the window that are writing: (manager, session_id) -> {tasks}
+_RUNNING_SAVES = defaultdict(set)
+
+
+async def _wait_running_saves(keys):
+    # Espera a que terminen las escrituras en curso de las claves indicadas
+    # Waits for the in-progress writes of the given keys to finish
+    running = [task for key in keys for task in _RUNNING_SAVES.get(key, ())]
+    if running:
+        await asyncio.gather(*running, return_exceptions=True)
+
+
+async def flush_pending_saves():
+    """
+    Escribe de inmediato todos los historiales con guardado pendiente (p. ej. al apagar la app)
+    y espera los guardados que ya estaban escribiendo.
+
+    Immediately writes every history with a pending save (e.g. on app shutdown)
+    and waits for the saves that were already writing.
+    """
+    pending = list(_PENDING_SAVES.items())
+    _PENDING_SAVES.clear()
+
+    for _, task in pending:
+        task.cancel()
+    await asyncio.gather(*(task for _, task in pending), return_exceptions=True)
+
+    await _wait_running_saves(list(_RUNNING_SAVES))
+
+    for (manager, session_id), _ in pending:
+        async with manager._session_locks[session_id]:
+            await asyncio.to_thread(manager.auto_save_history, session_id)
+
+
+def _response_text(entry):
+    """
+    Devuelve la respuesta de una entrada del historial como texto, sin modificar la entrada.
+
+    Returns a history entry's response as text, without modifying the entry.
+    """
+    response = entry["response"]
+    if not isinstance(response, str):
+        response = _json_dumps(response)
+
+    return response
 
 
 class ConversationManager:
@@ -38,7 +112,11 @@ class ConversationManager:
 
     __slots__ = ["llm",
                   "document_manager",
-                  "conversations"
+                  "conversations",
+                  "_retriever_cache",
+                  "_history_mtimes",
+                  "_save_lock",
+                  "_session_locks"
                   ]
 
     def __init__(
@@ -61,6 +139,22 @@ class ConversationManager:
         self.document_manager = document_manager
         self.conversations = {}
 
+        # Retrievers construidos por sesión junto con la huella del historial usado
+        # Per-session retrievers along with the history fingerprint they were built from
+        self._retriever_cache = {}
+
+        # mtime de cada archivo de historial al momento de leerlo o escribirlo
+        # mtime of each history file when it was last read or written
+        self._history_mtimes = {}
+
+        # Serializa las escrituras a disco, que pueden correr en hilos de fondo
+        # Serializes disk writes, which may run on background threads
+        self._save_lock = threading.Lock()
+
+        # Un candado por sesión para las escrituras desde rutas asíncronas
+        # One lock per session for writes coming from async routes
+        self._session_locks = defaultdict(asyncio.Lock)
+
         # Carga historiales guardados al iniciar
         # Load saved conversation history on startup
         self.load_conversation_histories()
@@ -94,6 +188,14 @@ class ConversationManager:
             return self.conversations[session_id]["history"]
         
         return []
+
+    def get_history_list(self, session_id):
+        """
+        Devuelve la lista de historial de la sesión para escribir en ella, creando la sesión si no existe.
+
+        Returns the session's history list for writing, creating the session if it does not exist.
+        """
+        return self.conversations[self.create_conversation(session_id)]["history"]
     
     def format_chat_history(self, session_id):
         """
@@ -108,7 +210,7 @@ class ConversationManager:
             # Parsear llaves que puedan romper el template
             # Parse curly braces to avoid prompt formatting issues
             query = entry["query"].replace("{", "{{").replace("}", "}}")
-            response = entry["response"].replace("{", "{{").replace("}", "}}")
+            response = _response_text(entry).replace("{", "{{").replace("}", "}}")
             
             formatted_history.append(("human", query))
             formatted_history.append(("ai", response))
@@ -120,7 +222,16 @@ class ConversationManager:
         Crea un retriever consciente del historial conversacional.
 
         Creates a history-aware retriever using LangChain tools.
+
+        Si el historial no cambió desde la última construcción, reutiliza el retriever previo.
+        If the history has not changed since the last build, the previous retriever is reused.
         """
+        fingerprint = self._history_fingerprint(session_id)
+        cached = self._retriever_cache.get(session_id)
+
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+
         base_retriever = self.document_manager.vectorstore.as_retriever(
             search_type="similarity", 
             search_kwargs={"k": 5}
@@ -139,8 +250,21 @@ class ConversationManager:
             base_retriever,
             contextualize_q_prompt
         )
+
+        self._retriever_cache[session_id] = (fingerprint, history_aware_retriever)
         
         return history_aware_retriever
+
+    def _history_fingerprint(self, session_id):
+        """
+        Calcula una huella barata del historial (longitud y timestamp del último turno).
+
+        Computes a cheap history fingerprint (length and last turn timestamp).
+        """
+        history = self.get_conversation_history(session_id)
+        last_timestamp = history[-1].get("timestamp") if history else None
+
+        return (id(self.document_manager.vectorstore), len(history), last_timestamp)
     
     def save_conversation_history(self,session_id):
         """
@@ -166,7 +290,7 @@ class ConversationManager:
         history_file = os.path.join(history_dir,f"{session_id}.txt")
 
         try:
-            with open(history_file,'a',encoding='utf-8') as f:
+            with self._save_lock, open(history_file,'a',encoding='utf-8') as f:
                 current_history = self.conversations[session_id]["history"]
 
                 saved_count = 0
@@ -179,12 +303,16 @@ class ConversationManager:
                     entry = current_history[i]
                     timestamp = entry.get("timestamp","N/A")
                     query = entry["query"]
-                    response = entry["response"]
+                    response = _response_text(entry)
 
                     f.write(f"Timestamp: {timestamp}\n")
                     f.write(f"Pregunta: {query}\n\n")
                     f.write(f"Respuesta: {response}\n")
                     f.write(f"--- Fin de respuesta ---\n\n")
+
+            # Lo escrito ya está en memoria: no hace falta volver a leerlo
+            # What was written is already in memory: no need to read it back
+            self._history_mtimes[session_id] = os.stat(history_file).st_mtime_ns
             return True
         
         except Exception as e:
@@ -197,6 +325,9 @@ class ConversationManager:
         Carga los historiales de conversación guardados desde disco.
 
         Loads saved conversation histories from disk.
+
+        Solo se leen los archivos cuyo mtime cambió desde la última lectura o escritura.
+        Only files whose mtime changed since the last read or write are read.
         """
         history_dir = os.path.join(os.path.dirname(__file__), 'conversation_histories')
 
@@ -204,12 +335,38 @@ class ConversationManager:
             print("No existe directorio de historiales")
             return
         
-        for filename in os.listdir(history_dir):
-            if not filename.endswith('.txt'):
-                continue
-                
-            session_id = filename.replace('.txt', '')
-            self._load_single_conversation_history(session_id, os.path.join(history_dir, filename))
+        with os.scandir(history_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.txt'):
+                    continue
+
+                session_id = entry.name.replace('.txt', '')
+                mtime = entry.stat().st_mtime_ns
+
+                if self._history_mtimes.get(session_id) == mtime:
+                    continue
+
+                self._load_single_conversation_history(session_id, entry.path)
+                self._history_mtimes[session_id] = mtime
+
+    def reload_conversation_history(self, session_id):
+        """
+        Vuelve a leer solo el archivo de historial de una sesión, si cambió desde la última lectura o escritura.
+
+        Re-reads only one session's history file, if it changed since it was last read or written.
+        """
+        history_file = os.path.join(os.path.dirname(__file__), 'conversation_histories', f"{session_id}.txt")
+
+        try:
+            mtime = os.stat(history_file).st_mtime_ns
+        except FileNotFoundError:
+            return
+
+        if self._history_mtimes.get(session_id) == mtime:
+            return
+
+        self._load_single_conversation_history(session_id, history_file)
+        self._history_mtimes[session_id] = mtime
 
     def _load_single_conversation_history(self, session_id, history_file):
         """
@@ -282,6 +439,68 @@ class ConversationManager:
         if entry["query"] not in existing_entries:
             self.conversations[session_id]["history"].append(entry)
 
+    async def record_interaction(self, session_id, entry):
+        """
+        Añade una entrada al historial de la sesión bajo su candado y programa un guardado agrupado.
+
+        Appends an entry to the session history under its lock and schedules a coalesced save.
+
+        Args:
+            session_id (str): ID de la sesión / Session ID
+            entry (dict): Entrada con query, response, timestamp y raw_response / Entry with query, response, timestamp and raw_response
+        """
+        # La respuesta se guarda como texto desde el inicio: el historial tiene el mismo tipo
+        # antes y después de escribirse a disco
+        # The response is stored as text from the start: history has the same type
+        # before and after it is written to disk
+        entry["response"] = _response_text(entry)
+
+        # Solo se toca el historial de esta sesión, protegido por su propio candado
+        # Only this session's history is touched, guarded by its own lock
+        async with self._session_locks[session_id]:
+            await asyncio.to_thread(self.reload_conversation_history, session_id)
+            self.get_history_list(session_id).append(entry)
+
+        self.schedule_save(session_id)
+
+    def schedule_save(self, session_id):
+        """
+        Programa el guardado de la sesión tras HISTORY_SAVE_DEBOUNCE segundos, si no hay uno pendiente.
+
+        Schedules the session save after HISTORY_SAVE_DEBOUNCE seconds, unless one is already pending.
+        """
+        key = (self, session_id)
+        if key not in _PENDING_SAVES:
+            _PENDING_SAVES[key] = asyncio.create_task(self._debounced_save(session_id))
+
+    async def _debounced_save(self, session_id):
+        """
+        Espera la ventana de agrupación y escribe el historial fuera del event loop.
+
+        Waits for the coalescing window and writes the history off the event loop.
+        """
+        key = (self, session_id)
+        task = asyncio.current_task()
+        try:
+            await asyncio.sleep(HISTORY_SAVE_DEBOUNCE)
+        finally:
+            # Lo que llegue a partir de aquí programa un guardado nuevo
+            # Anything arriving from here on schedules a new save
+            if _PENDING_SAVES.get(key) is task:
+                del _PENDING_SAVES[key]
+
+        # Sigue registrado hasta terminar de escribir, para que el apagado y el borrado lo esperen
+        # Stays registered until the write finishes, so shutdown and deletion wait for it
+        _RUNNING_SAVES[key].add(task)
+        try:
+            async with self._session_locks[session_id]:
+                await asyncio.to_thread(self.auto_save_history, session_id)
+        finally:
+            running = _RUNNING_SAVES[key]
+            running.discard(task)
+            if not running:
+                del _RUNNING_SAVES[key]
+
     def auto_save_history(self, session_id):
         """
         Guarda automaticamente el historial despues de cada actualizacion. 
@@ -310,14 +529,50 @@ class ConversationManager:
         if session_id in self.conversations:
             del self.conversations[session_id]
 
-        if os.path.exists(history_file):
-            try:
-                os.remove(history_file)
-                return True
-            except Exception as e:
-                print(f"Error al eliminar archivo de historial: {str(e)}")
-                return False
+        self._retriever_cache.pop(session_id, None)
+        self._history_mtimes.pop(session_id, None)
+
+        pending = _PENDING_SAVES.pop((self, session_id), None)
+        if pending is not None:
+            pending.cancel()
+
+        # Con el candado de escritura, un guardado a medias termina antes de borrar el archivo
+        # With the write lock held, a half-done save finishes before the file is removed
+        with self._save_lock:
+            if os.path.exists(history_file):
+                try:
+                    os.remove(history_file)
+                    return True
+                except Exception as e:
+                    print(f"Error al eliminar archivo de historial: {str(e)}")
+                    return False
         return True
+
+    async def delete_session(self, session_id):
+        """
+        Versión para rutas asíncronas de delete_conversation_history: cancela y espera los guardados
+        de la sesión, borra bajo su candado y solo entonces descarta el candado.
+
+        Async-route version of delete_conversation_history: cancels and waits for the session's saves,
+        deletes under its lock and only then drops the lock.
+
+        Returns:
+            bool: True si se elimino correctamente, False en lo contrario.
+        """
+        key = (self, session_id)
+
+        pending = _PENDING_SAVES.pop(key, None)
+        if pending is not None:
+            pending.cancel()
+            await asyncio.gather(pending, return_exceptions=True)
+
+        await _wait_running_saves([key])
+
+        async with self._session_locks[session_id]:
+            deleted = await asyncio.to_thread(self.delete_conversation_history, session_id)
+
+        self._session_locks.pop(session_id, None)
+        return deleted
     
 
     def update_history_with_final_response(self, session_id, query, final_response):
@@ -20,16 +20,96 @@ Versión / Version: 1.0.0
 # ────────────────────────────────
 # Librerías estándar / Standard libraries
 import os
-from dataclasses import dataclass
+import time
+import uuid
+from itertools import chain
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 
 # ────────────────────────────────
 # Librerías de terceros / Third-party libraries
-from langchain_community.document_loaders import PyPDFLoader, TextLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
-from langchain_chroma import Chroma
-from langchain_core.documents import Document
+# Los loaders, embeddings y vectorstores se importan dentro de los métodos que los usan
+# para no cargarlos (pypdf, chromadb, onnxruntime...) en procesos que nunca ingieren documentos.
+# Loaders, embeddings and vectorstores are imported inside the methods that use them
+# so they are not loaded (pypdf, chromadb, onnxruntime...) in processes that never ingest documents.
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
+
+# ────────────────────────────────
+# Imports locales / Local imports
+from .embedding_cache import EmbeddingCache, CachedQueryEmbeddings
+
+
+# Número máximo de textos por llamada al proveedor de embeddings
+# Maximum number of texts per call to the embedding provider
+EMBEDDING_BATCH_SIZE = 100
+
+# Lotes de embeddings en vuelo simultáneamente (limitado por el proveedor)
+# Embedding batches in flight concurrently (bounded by provider rate limits)
+EMBEDDING_CONCURRENCY = max(1, int(os.environ.get("EMBED_CONCURRENCY", 8)))
+
+# Archivo de la caché de embeddings dentro de persist_directory
+# Embedding cache file inside persist_directory
+EMBEDDING_CACHE_FILE = "embedding_cache.sqlite3"
+
+# A partir de este número de vectores FAISS usa un índice HNSW en lugar de búsqueda exacta
+# From this number of vectors FAISS uses an HNSW index instead of exact search
+FAISS_HNSW_THRESHOLD = 100_000
+
+# Vectores usados para entrenar el cuantizador int8 de FAISS
+# Vectors used to train the FAISS int8 quantizer
+FAISS_TRAINING_SAMPLE = 10_000
+
+
+# Cargador de langchain_community.document_loaders por extensión / document loader name by extension
+_LOADERS = {
+    ".pdf": "PyPDFLoader",
+    ".txt": "TextLoader"
+}
+
+
+def _is_rate_limited(exception):
+    """
+    Indica si el error (o su causa) es un límite de cuota del proveedor (429).
+
+    Tells whether the error (or its cause) is a provider quota limit (429).
+    """
+    from google.api_core.exceptions import ResourceExhausted
+
+    return isinstance(exception, ResourceExhausted) or isinstance(exception.__cause__, ResourceExhausted)
+
+
+def _file_signature(filepath):
+    """
+    Firma de un archivo (mtime y tamaño) para detectar si cambió desde que se indexó.
+
+    File signature (mtime and size) used to detect whether it changed since it was indexed.
+    """
+    stat = os.stat(filepath)
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def _load_file_worker(filepath):
+    """
+    Carga un archivo por tipo (PDF o TXT) y retorna documentos LangChain.
+
+    Loads a file by type (PDF or TXT) and returns LangChain documents.
+    """
+    loader_name = _LOADERS.get(os.path.splitext(filepath)[1].lower())
+
+    if loader_name is None:
+        return []
+
+    from langchain_community import document_loaders
+
+    documents = getattr(document_loaders, loader_name)(filepath).load()
+
+    signature = _file_signature(filepath)
+    for document in documents:
+        document.metadata["signature"] = signature
+
+    return documents
 
 
 class DocumentManager:
@@ -45,9 +125,15 @@ class DocumentManager:
                  "chunk_size",
                  "chunk_overlap",
                  "embedding_model",
+                 "vectorstore_backend",
+                 "exact",
+                 "embeddings",
+                 "embedding_calls",
+                 "embedding_cache",
                  "vectorstore",
                  "text_splitter",
-                 "pdf_paths"]
+                 "pdf_paths",
+                 "_write_lock"]
 
     def __init__(
             self,
@@ -58,12 +144,18 @@ class DocumentManager:
             filter_directories: Optional[List[str]] = None,
             chunk_size: int = 1000,
             chunk_overlap: int = 200,
+            vectorstore_backend: str = "chroma",
+            exact: bool = False,
             
         ) -> None:
         """
         Inicializa el gestor de documentos con configuración para embeddings y directorios.
 
         Initializes the document manager with embedding and directory settings.
+
+        Args:
+            vectorstore_backend (str): "chroma" (por defecto / default) o "faiss"
+            exact (bool): Con FAISS, guarda vectores FP32 en lugar de int8 / With FAISS, keep FP32 vectors instead of int8
         """
 
         self.KEY = KEY
@@ -75,9 +167,20 @@ class DocumentManager:
         self.chunk_overlap = chunk_overlap
 
         self.embedding_model = embedding
+        self.vectorstore_backend = vectorstore_backend
+        self.exact = exact
+        self.embeddings = None
+        self.embedding_calls = 0
+        self.embedding_cache = None
+
+        # Chroma (sqlite) no es seguro para escrituras concurrentes
+        # Chroma (sqlite) is not safe for concurrent writes
+        self._write_lock = threading.Lock()
         
         # Vectorstore y splitter iniciales
         self.vectorstore = None 
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=self.chunk_size, 
             chunk_overlap=self.chunk_overlap
@@ -92,25 +195,31 @@ class DocumentManager:
     def _get_filtered_pdf_paths(self):
         """
         Obtiene las rutas de los PDFs aplicando filtros si están configurados.
+        Sin filtros incluye cualquier tipo con cargador registrado (p. ej. los TXT generados).
 
         Gets the PDF file paths, applying filters if configured.
+        Without filters it includes any type with a registered loader (e.g. generated TXT files).
         """
         all_files = []
         
+        if not os.path.isdir(self.pdf_directory):
+            print(f"El directorio {self.pdf_directory} no existe.")
+            return all_files
         
         if self.filter_directories is None:
-            return [os.path.join(self.pdf_directory, f) for f in os.listdir(self.pdf_directory) 
-                    if f.endswith('.pdf') and os.path.isfile(os.path.join(self.pdf_directory, f))]
+            with os.scandir(self.pdf_directory) as entries:
+                return [entry.path for entry in entries if os.path.splitext(entry.name)[1].lower() in _LOADERS and entry.is_file()]
         
         for subdir in self.filter_directories:
             subdir_path = os.path.join(self.pdf_directory, subdir)
             
             if os.path.isdir(subdir_path):
-                all_files.extend([
-                    os.path.join(subdir_path, f) 
-                    for f in os.listdir(subdir_path) 
-                    if f.endswith('.pdf') and os.path.isfile(os.path.join(subdir_path, f))
-                ])
+                with os.scandir(subdir_path) as entries:
+                    all_files.extend([
+                        entry.path
+                        for entry in entries
+                        if entry.name.endswith('.pdf') and entry.is_file()
+                    ])
         
         return all_files
 
@@ -126,9 +235,19 @@ class DocumentManager:
         Initializes or loads the vector store from persistence.
         """
         embeddings = self._create_embedings()
+        self.embeddings = embeddings
+
+        vectorstore_exists = self._vectorstore_exist()
+
+        os.makedirs(self.persist_directory, exist_ok=True)
+        self.embedding_cache = EmbeddingCache(
+            os.path.join(self.persist_directory, EMBEDDING_CACHE_FILE),
+            self.embedding_model
+        )
         
-        if self._vectorstore_exist():
+        if vectorstore_exists:
             self._load_existing_vectorstore(embeddings)
+            self._index_changed_files()
             return
         
         self._create_new_vectorstore(embeddings)
@@ -138,12 +257,16 @@ class DocumentManager:
         Crea el modelo de embeddings de Google Generative AI.
 
         Creates the embedding model from Google Generative AI.
+
+        Los embeddings de consultas se memoizan / Query embeddings are memoized.
         """
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
         embeddings = GoogleGenerativeAIEmbeddings(
             google_api_key=self.KEY,
             model=self.embedding_model
         )
-        return embeddings
+        return CachedQueryEmbeddings(embeddings, self.embedding_model)
     
     def _vectorstore_exist(self):
         """
@@ -151,7 +274,10 @@ class DocumentManager:
 
         Checks whether a persistent vector store already exists.
         """
-        return os.path.exists(self.persist_directory) and len(os.listdir(self.persist_directory)) > 0
+        if self.vectorstore_backend == "faiss":
+            return os.path.isfile(os.path.join(self.persist_directory, "index.faiss"))
+
+        return os.path.isfile(os.path.join(self.persist_directory, "chroma.sqlite3"))
 
     def _load_existing_vectorstore(self, embeddings):
         """
@@ -160,11 +286,143 @@ class DocumentManager:
         Loads existing vectors from the persistence directory.
         """
         print(f"Cargando vectores existentes desde {self.persist_directory}")
+
+        if self.vectorstore_backend == "faiss":
+            from langchain_community.vectorstores import FAISS
+            from langchain_community.vectorstores.utils import DistanceStrategy
+
+            # El docstore de FAISS se serializa con pickle y es generado por nosotros
+            # The FAISS docstore is pickled and generated by us
+            self.vectorstore = FAISS.load_local(
+                self.persist_directory,
+                embeddings,
+                allow_dangerous_deserialization=True,
+                normalize_L2=True,
+                distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
+            )
+            return
+
+        from langchain_chroma import Chroma
+
         self.vectorstore = Chroma(
             persist_directory=self.persist_directory,
             embedding_function=embeddings
         )
 
+    def _index_changed_files(self):
+        """
+        Indexa solo los archivos nuevos o modificados (según su firma) desde la última carga,
+        eliminando antes los fragmentos obsoletos de los modificados.
+
+        Indexes only the files that are new or modified (by signature) since the last load,
+        first removing the stale chunks of modified ones.
+
+        Todos los asistentes comparten persist_directory: solo se actualiza el directorio cuyos
+        archivos ya están en el vectorstore, sin mezclar los PDFs de los demás.
+
+        Every assistant shares persist_directory: only the directory whose files are already
+        in the vectorstore is updated, without merging in the others' PDFs.
+        """
+        indexed = self._indexed_signatures()
+
+        directory_prefix = os.path.join(self.pdf_directory, "")
+        if not any(source.startswith(directory_prefix) for source in indexed):
+            return
+
+        # Fragmentos indexados antes de guardar firmas: se les asigna la actual sin volver a vectorizarlos
+        # Chunks indexed before signatures were stored: they get the current one without re-embedding
+        unsigned = [
+            filepath for filepath in self.pdf_paths
+            if filepath in indexed and indexed[filepath] is None
+        ]
+        if unsigned:
+            self._backfill_signatures(unsigned)
+            for filepath in unsigned:
+                indexed[filepath] = _file_signature(filepath)
+
+        changed_paths = [
+            filepath for filepath in self.pdf_paths
+            if indexed.get(filepath) != _file_signature(filepath)
+        ]
+
+        if not changed_paths:
+            return
+
+        print(f"Indexando {len(changed_paths)} archivos nuevos o modificados")
+
+        stale_sources = [filepath for filepath in changed_paths if filepath in indexed]
+        if stale_sources:
+            self._delete_sources(stale_sources)
+
+        documents = self._split_documents(chain.from_iterable(self._load_files(changed_paths)))
+        if documents:
+            self._add_documents(documents)
+
+    def _indexed_signatures(self):
+        """
+        Retorna {source: signature} de los fragmentos ya guardados en el vectorstore.
+
+        Returns {source: signature} for the chunks already stored in the vectorstore.
+        """
+        if self.vectorstore_backend == "faiss":
+            metadatas = [document.metadata for document in self.vectorstore.docstore._dict.values()]
+        else:
+            metadatas = self.vectorstore.get(include=["metadatas"])["metadatas"]
+
+        return {
+            metadata["source"]: metadata.get("signature")
+            for metadata in metadatas
+            if metadata and "source" in metadata
+        }
+
+    def _backfill_signatures(self, sources):
+        """
+        Guarda la firma actual en los fragmentos de los archivos indicados, sin tocar sus vectores.
+
+        Stores the current signature on the chunks of the given files, without touching their vectors.
+        """
+        signatures = {source: _file_signature(source) for source in sources}
+
+        with self._write_lock:
+            if self.vectorstore_backend == "faiss":
+                for document in self.vectorstore.docstore._dict.values():
+                    signature = signatures.get(document.metadata.get("source"))
+                    if signature is not None:
+                        document.metadata["signature"] = signature
+                self.vectorstore.save_local(self.persist_directory)
+                return
+
+            stored = self.vectorstore._collection.get(
+                where={"source": {"$in": list(signatures)}},
+                include=["metadatas"]
+            )
+            metadatas = [
+                {**metadata, "signature": signatures[metadata["source"]]}
+                for metadata in stored["metadatas"]
+            ]
+            if stored["ids"]:
+                self.vectorstore._collection.update(ids=stored["ids"], metadatas=metadatas)
+
+    def _delete_sources(self, sources):
+        """
+        Elimina del vectorstore todos los fragmentos que provienen de los archivos indicados.
+
+        Removes from the vectorstore every chunk that comes from the given files.
+        """
+        with self._write_lock:
+            if self.vectorstore_backend == "faiss":
+                sources = set(sources)
+                ids = [
+                    doc_id for doc_id, document in self.vectorstore.docstore._dict.items()
+                    if document.metadata.get("source") in sources
+                ]
+                if ids:
+                    self.vectorstore.delete(ids)
+                    self.vectorstore.save_local(self.persist_directory)
+                return
+
+            self.vectorstore._collection.delete(where={"source": {"$in": list(sources)}})
+
     def _create_new_vectorstore(self, embeddings):
         """
         Crea un nuevo vectorstore desde cero a partir de los documentos cargados.
@@ -172,68 +430,209 @@ class DocumentManager:
         Creates a new vectorstore from scratch using loaded documents.
         """
         print("Vectorizando documentos por primera vez...")
-        os.makedirs(self.persist_directory, exist_ok=True)
         
-        documents = self.load_documents_from_directory(self.pdf_directory)
+        documents = self.load_documents_from_directory()
+
+        if self.vectorstore_backend == "faiss":
+            # El índice se construye con la dimensión del primer lote de vectores
+            # The index is built using the dimension of the first vector batch
+            self.vectorstore = None
+            self._add_documents(documents)
+
+            if self.vectorstore is None:
+                self.vectorstore = self._create_faiss_store(len(embeddings.embed_query("dimension")))
+                self.vectorstore.save_local(self.persist_directory)
+
+        else:
+            from langchain_chroma import Chroma
+
+            self.vectorstore = Chroma(
+                persist_directory=self.persist_directory,
+                embedding_function=embeddings
+            )
+            self._add_documents(documents)
         
-        self.vectorstore = Chroma.from_documents(
-            documents=documents,
-            embedding=embeddings,
-            persist_directory=self.persist_directory
-        )
-        print(f"Vectores guardados en {self.persist_directory}")    
+        print(f"Vectores guardados en {self.persist_directory} ({self.embedding_calls} llamadas de embeddings)")
 
-    def load_documents_from_directory(self, directory):
+    def _add_documents(self, documents):
         """
-        Carga documentos desde un directorio aplicando filtros si están definidos.
+        Vectoriza documentos en lotes y los inserta directamente en la colección.
 
-        Loads documents from a directory, applying filters if defined.
+        Embeds documents in batches and inserts them directly into the collection.
 
-        Args:
-            directory (str): Ruta base / Base directory path
+        Returns:
+            int: Número de documentos añadidos / Number of documents added
         """
-        if not os.path.exists(directory):
-            print(f"El directorio {directory} no existe.")
-            return []
-        
-        documents = []
-        
-        if self.filter_directories is not None:
-            
-            for filepath in self.pdf_paths:
-                
-                if os.path.isfile(filepath):
-                    filename = os.path.basename(filepath)
-                    docs = self._load_file_by_type(filepath, filename)
-                    
-                    if docs:
-                        documents.extend(docs)
+        texts = [doc.page_content for doc in documents]
+        metadatas = [doc.metadata for doc in documents]
+
+        if not texts:
+            return 0
+
+        hashes = [hashlib.sha256(text.encode("utf-8")).digest() for text in texts]
+        vectors = self._embed_texts(texts, hashes)
+
+        if self.vectorstore_backend == "faiss":
+            self._add_to_faiss(texts, vectors, metadatas)
+            return len(texts)
+
+        for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+            end = start + EMBEDDING_BATCH_SIZE
+            self._add_to_collection(texts[start:end], vectors[start:end], metadatas[start:end])
+
+        return len(texts)
+
+    def _embed_texts(self, texts, hashes):
+        """
+        Obtiene los embeddings consultando primero la caché persistente y pidiendo
+        al proveedor solo los textos faltantes, en lotes concurrentes.
 
+        Gets embeddings by checking the persistent cache first and requesting
+        only the missing texts from the provider, in concurrent batches.
+        Repeated chunks (page headers/footers) are embedded once and share the vector.
+        """
+        vectors = self.embedding_cache.get_many(hashes)
+
+        seen = {}
+        for i, text_hash in enumerate(hashes):
+            if text_hash not in vectors and text_hash not in seen:
+                seen[text_hash] = i
+        missing = list(seen.values())
+
+        if missing:
+            batches = [missing[start:start + EMBEDDING_BATCH_SIZE] for start in range(0, len(missing), EMBEDDING_BATCH_SIZE)]
+            text_batches = [[texts[i] for i in batch] for batch in batches]
+
+            # executor.map conserva el orden de los lotes / executor.map preserves batch order
+            with ThreadPoolExecutor(max_workers=min(EMBEDDING_CONCURRENCY, len(batches))) as executor:
+                for batch, batch_vectors in zip(batches, executor.map(self._embed_batch, text_batches)):
+                    self.embedding_calls += 1
+
+                    new_vectors = {hashes[i]: vector for i, vector in zip(batch, batch_vectors)}
+                    self.embedding_cache.put_many(new_vectors)
+                    vectors.update(new_vectors)
+
+        return [vectors[text_hash] for text_hash in hashes]
+
+    @retry(
+        retry=retry_if_exception(_is_rate_limited),
+        wait=wait_exponential(multiplier=1, max=30),
+        stop=stop_after_attempt(5),
+        reraise=True
+    )
+    def _embed_batch(self, texts):
+        """
+        Realiza una única llamada al proveedor de embeddings para un lote de textos,
+        reintentando con espera exponencial si se alcanza el límite de cuota.
+
+        Performs a single embedding provider call for a batch of texts,
+        retrying with exponential backoff when the quota limit is hit.
+        """
+        return self.embeddings.embed_documents(texts)
+
+    def _add_to_collection(self, texts, vectors, metadatas):
+        """
+        Inserta textos ya vectorizados en la colección de Chroma.
+
+        Inserts already embedded texts into the Chroma collection.
+        """
+        with self._write_lock:
+            self.vectorstore._collection.add(
+                ids=[str(uuid.uuid4()) for _ in texts],
+                embeddings=vectors,
+                documents=texts,
+                metadatas=metadatas
+            )
+
+    def _add_to_faiss(self, texts, vectors, metadatas):
+        """
+        Inserta textos ya vectorizados en el índice FAISS y lo persiste en disco.
+
+        Inserts already embedded texts into the FAISS index and persists it to disk.
+        """
+        with self._write_lock:
+            if self.vectorstore is None:
+                self.vectorstore = self._create_faiss_store(len(vectors[0]), vectors)
+
+            self.vectorstore.add_embeddings(zip(texts, vectors), metadatas=metadatas)
+            self.vectorstore.save_local(self.persist_directory)
+
+    def _create_faiss_store(self, dimension, training_vectors=()):
+        """
+        Crea un vectorstore FAISS vacío con producto interno sobre vectores normalizados (coseno).
+        Usa un índice plano hasta FAISS_HNSW_THRESHOLD vectores y HNSW a partir de ahí.
+        Salvo que exact sea True, los vectores se guardan cuantizados a int8, entrenando
+        el cuantizador con los primeros FAISS_TRAINING_SAMPLE vectores.
+
+        Creates an empty FAISS vectorstore using inner product over normalized vectors (cosine).
+        Uses a flat index up to FAISS_HNSW_THRESHOLD vectors and HNSW beyond that.
+        Unless exact is True, vectors are stored quantized to int8, training the
+        quantizer on the first FAISS_TRAINING_SAMPLE vectors.
+        """
+        import faiss
+        import numpy as np
+        from langchain_community.docstore.in_memory import InMemoryDocstore
+        from langchain_community.vectorstores import FAISS
+        from langchain_community.vectorstores.utils import DistanceStrategy
+
+        count = len(training_vectors)
+        # Sin vectores no hay con qué entrenar el cuantizador / Without vectors there is nothing to train on
+        quantize = not self.exact and count > 0
+
+        if count > FAISS_HNSW_THRESHOLD:
+            if quantize:
+                index = faiss.IndexHNSWSQ(dimension, faiss.ScalarQuantizer.QT_8bit, 32, faiss.METRIC_INNER_PRODUCT)
+            else:
+                index = faiss.IndexHNSWFlat(dimension, 32, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = 200
+            index.hnsw.efSearch = 64
+        elif quantize:
+            index = faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT)
         else:
-            for filename in os.listdir(directory):
-                
-                filepath = os.path.join(directory, filename)
-                
-                if os.path.isfile(filepath):
-                    docs = self._load_file_by_type(filepath, filename)
-                    
-                    if docs:
-                        documents.extend(docs)
+            index = faiss.IndexFlatIP(dimension)
+
+        if not index.is_trained:
+            sample = np.array(training_vectors[:FAISS_TRAINING_SAMPLE], dtype=np.float32)
+            faiss.normalize_L2(sample)
+            index.train(sample)
+
+        return FAISS(
+            embedding_function=self.embeddings,
+            index=index,
+            docstore=InMemoryDocstore(),
+            index_to_docstore_id={},
+            normalize_L2=True,
+            distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
+        )
+
+    def load_documents_from_directory(self):
+        """
+        Carga los documentos de pdf_paths, calculadas una sola vez en __init__ aplicando los filtros.
+
+        Loads the documents in pdf_paths, computed once in __init__ with filters applied.
+        """
+        # Las páginas se pasan al splitter a medida que se cargan, sin acumularlas en una lista intermedia
+        # Pages are streamed into the splitter as they load, without accumulating an intermediate list
+        documents = chain.from_iterable(self._load_files(self.pdf_paths))
         
         return self._split_documents(documents)
 
-
-    def _load_file_by_type(self, filepath, filename):
+    def _load_files(self, filepaths):
         """
-        Carga un archivo por tipo (PDF o TXT) y retorna documentos LangChain.
+        Carga los archivos en paralelo con hilos. Se evitan procesos porque esto corre al importar
+        las rutas: con spawn (Windows, macOS) cada proceso volvería a importar main.py y crear la app.
 
-        Loads a file by type (PDF or TXT) and returns LangChain documents.
+        Loads files in parallel with threads. Processes are avoided because this runs while routes
+        are imported: with spawn (Windows, macOS) each process would re-import main.py and build the app.
+        Yields each file's documents in order as soon as they are available.
         """
-        if filename.endswith('.pdf'):
-            return PyPDFLoader(filepath).load()
-        elif filename.endswith('.txt'):
-            return TextLoader(filepath).load()
-        return []
+        if len(filepaths) <= 1:
+            for filepath in filepaths:
+                yield _load_file_worker(filepath)
+            return
+
+        with ThreadPoolExecutor(max_workers=min(os.cpu_count() or 1, len(filepaths))) as executor:
+            yield from executor.map(_load_file_worker, filepaths)
 
     def _split_documents(self, documents):
         """
@@ -243,13 +642,8 @@ class DocumentManager:
         """
         if not documents:
             return []
-            
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200
-        )
 
-        return text_splitter.split_documents(documents)
+        return self.text_splitter.split_documents(documents)
     
 
     def add_document(self, content, metadata=None):
@@ -265,14 +659,13 @@ class DocumentManager:
         if metadata is None:
             metadata = {"source": "generated_content"}
         
+        from langchain_core.documents import Document
+
         document = Document(page_content=content, metadata=metadata)
         
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-        docs = text_splitter.split_documents([document])
-        
-        ids = self.vectorstore.add_documents(docs)
+        docs = self.text_splitter.split_documents([document])
                 
-        return len(docs)
+        return self._add_documents(docs)
     
     def add_content_to_knowledge_base(self, content, source_name=None):
         """
@@ -281,10 +674,15 @@ class DocumentManager:
         Adds generated content to the knowledge base and persists it to file.
         """
         if not source_name:
-            source_name = f"generado_{len(os.listdir(self.pdf_directory)) + 1}.txt"
+            # Nombre ordenado por tiempo: no recorre el directorio y no choca entre solicitudes
+            # Time-ordered name: no directory scan and no clashes between requests
+            source_name = f"generado_{time.time_ns()}_{os.getpid()}.txt"
         
         output_path = os.path.join(self.pdf_directory, source_name)
         with open(output_path, 'w', encoding='utf-8') as f:
             f.write(content)
         
-        return self.add_document(content, metadata={"source": output_path})
\ No newline at end of file
+        return self.add_document(
+            content,
+            metadata={"source": output_path, "signature": _file_signature(output_path)}
+        )
\ No newline at end of file
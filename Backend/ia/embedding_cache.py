@@ -0,0 +1,155 @@
+"""
+Nombre:
+    embedding_cache.py
+
+Descripción:
+    Caché persistente de embeddings indexada por modelo y hash SHA-256 del texto,
+    para evitar volver a pagar llamadas al proveedor al reindexar los mismos fragmentos.
+
+    Persistent embedding cache keyed by model and SHA-256 hash of the text,
+    to avoid paying provider calls again when re-indexing the same chunks.
+
+    Incluye además una caché LRU en memoria para los embeddings de consultas.
+
+    Also includes an in-memory LRU cache for query embeddings.
+
+Autor / Author:
+    Abdiel Fritsche Barajas
+
+Fecha de creación / Created: 2026-10-15
+Última modificación / Last modified: 2026-10-15
+Versión / Version: 1.0.0
+"""
+
+# ────────────────────────────────
+# Librerías estándar / Standard libraries
+import sqlite3
+import threading
+from array import array
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+# ────────────────────────────────
+# Librerías de terceros / Third-party libraries
+from langchain_core.embeddings import Embeddings
+
+
+# Límite de parámetros por consulta en SQLite / SQLite per-query parameter limit
+_MAX_QUERY_PARAMS = 500
+
+# Modelos de embeddings registrados para consultas, compartidos entre instancias
+# Registered query embedding models, shared across instances
+_QUERY_EMBEDDERS: Dict[str, Embeddings] = {}
+
+
+@lru_cache(maxsize=2048)
+def _cached_embed_query(model: str, text: str) -> Tuple[float, ...]:
+    """
+    Embedding de una consulta memoizado por modelo y texto (tupla para ser inmutable).
+
+    Query embedding memoized by model and text (tuple so it stays immutable).
+    """
+    return tuple(_QUERY_EMBEDDERS[model].embed_query(text))
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    Envuelve un modelo de embeddings y memoiza embed_query con una caché LRU compartida.
+
+    Wraps an embedding model and memoizes embed_query with a shared LRU cache.
+    """
+    __slots__ = ["embeddings",
+                 "model"]
+
+    def __init__(self, embeddings: Embeddings, model: str) -> None:
+        self.embeddings = embeddings
+        self.model = model
+        _QUERY_EMBEDDERS.setdefault(model, embeddings)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return list(_cached_embed_query(self.model, text))
+
+
+class EmbeddingCache:
+    """
+    Clase que almacena vectores de embeddings en un archivo SQLite (modo WAL).
+
+    Class that stores embedding vectors in a SQLite file (WAL mode).
+    """
+    __slots__ = ["path",
+                 "model",
+                 "_connection",
+                 "_lock"]
+
+    def __init__(self, path: str, model: str) -> None:
+        """
+        Abre (o crea) la caché en la ruta indicada para un modelo de embeddings.
+
+        Opens (or creates) the cache at the given path for an embedding model.
+
+        Args:
+            path (str): Ruta del archivo SQLite / SQLite file path
+            model (str): Modelo de embeddings / Embedding model
+        """
+        self.path = path
+        self.model = model
+
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, "
+            "hash BLOB NOT NULL, "
+            "vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, hash))"
+        )
+        self._connection.commit()
+        self._lock = threading.Lock()
+
+    def get_many(self, hashes: List[bytes]) -> Dict[bytes, List[float]]:
+        """
+        Recupera los vectores almacenados para los hashes dados.
+
+        Retrieves the stored vectors for the given hashes.
+
+        Returns:
+            dict: hash -> vector, solo para los hashes encontrados / only for hashes found
+        """
+        found = {}
+
+        with self._lock:
+            for start in range(0, len(hashes), _MAX_QUERY_PARAMS):
+                chunk = hashes[start:start + _MAX_QUERY_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._connection.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                    (self.model, *chunk)
+                )
+
+                for text_hash, blob in rows:
+                    vector = array("d")
+                    vector.frombytes(blob)
+                    found[text_hash] = vector.tolist()
+
+        return found
+
+    def put_many(self, vectors: Dict[bytes, List[float]]) -> None:
+        """
+        Guarda nuevos vectores en la caché.
+
+        Stores new vectors in the cache.
+
+        Args:
+            vectors (dict): hash -> vector
+        """
+        if not vectors:
+            return
+
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, vector) VALUES (?, ?, ?)",
+                [(self.model, text_hash, array("d", vector).tobytes()) for text_hash, vector in vectors.items()]
+            )
@@ -22,18 +22,228 @@ Versión / Version: 1.0.0
 # ────────────────────────────────
 # Librerías estándar / Standard libraries
 import re
-from datetime import datetime
+import hashlib
+import threading
+from collections import OrderedDict
 import json
+from typing import Optional, Tuple
 
 # ────────────────────────────────
 # Librerías de terceros / Third-party libraries
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_google_genai import ChatGoogleGenerativeAI
+from pydantic import ValidationError
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 
 # ────────────────────────────────
 # Imports locales / Local imports
-from models import RequirementResponse,UserStoryResponse,EpicResponse
+from models import RequirementResponse,UserStoryResponse,EpicResponse,REQUIREMENT_FORMAT_INSTRUCTIONS
+from models import RequirementItem, EpicItem, UserStoryItem
+from utils.timestamps import now_ts
+
+# Respuestas estandarizadas que se conservan en memoria / Standardized responses kept in memory
+STANDARDIZED_CACHE_SIZE = 512
+
+# Modelo de respuesta por tipo de salida esperado / Response model by expected output type
+_RESPONSE_MODELS = {
+    "requerimientos": RequirementResponse,
+    "epicas": EpicResponse,
+    "historias_usuario": UserStoryResponse
+}
+
+# Modelo de cada elemento de "content" por tipo de salida / Model of each "content" item by output type
+_ITEM_MODELS = {
+    "requerimientos": RequirementItem,
+    "epicas": EpicItem,
+    "historias_usuario": UserStoryItem
+}
+
+# ────────────────────────────────
+# Expresiones regulares precompiladas / Precompiled regular expressions
+_LIST_ITEM_RE = re.compile(r'(?:^|\n)\s*(?:\d+\.|\*|\-)\s*(.+?)(?:\n|$)')
+_MISSING_RE = re.compile(r'(?:necesito|falta)(?:.*?)(?:información|detalles)(.*?)(?:$|(?:para generar))', re.DOTALL)
+
+# Palabras clave buscadas en una sola pasada; la prioridad se resuelve después
+# Keywords searched in a single pass; priority is resolved afterwards
+_INSUFFICIENT_KEYWORDS = frozenset({"información insuficiente", "necesito más información"})
+_KEYWORDS_RE = re.compile(
+    r'información insuficiente|necesito más información|error|procesar|procesamiento'
+    r'|requerimientos?|requisito|requirements|epicas?|epics|historias_usuario',
+    re.IGNORECASE
+)
+
+
+def _find_keywords(text):
+    """
+    Retorna el conjunto (en minúsculas) de palabras clave de clasificación presentes en el texto.
+
+    Returns the (lowercased) set of classification keywords present in the text.
+    """
+    return {match.group(0).lower() for match in _KEYWORDS_RE.finditer(text)}
+
+
+def _find_json_span(s: str, pos: int = 0) -> Optional[Tuple[int, int]]:
+    """
+    Recorre el texto una sola vez desde pos y devuelve (inicio, fin) del primer objeto JSON
+    con llaves balanceadas, ignorando las llaves que aparecen dentro de cadenas.
+
+    Walks the text once from pos and returns (start, end) of the first JSON object
+    with balanced braces, ignoring braces that appear inside string literals.
+    """
+    start = s.find("{", pos)
+    if start == -1:
+        return None
+
+    depth = 0
+    in_string = False
+    escaped = False
+
+    for i in range(start, len(s)):
+        char = s[i]
+
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+
+        elif char == '"':
+            in_string = True
+
+        elif char == "{":
+            depth += 1
+
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return start, i + 1
+
+    return None
+
+
+class ContentItemScanner:
+    """
+    Escáner incremental que recibe la respuesta del LLM por fragmentos y devuelve cada objeto
+    completo del arreglo "content" en cuanto se cierra, sin esperar al JSON completo.
+
+    Incremental scanner that receives the LLM response in chunks and returns each complete
+    object of the "content" array as soon as it closes, without waiting for the full JSON.
+    """
+
+    __slots__ = ["text",
+                 "_pos",
+                 "_state",
+                 "_depth",
+                 "_in_string",
+                 "_escaped",
+                 "_item_start",
+                 ]
+
+    def __init__(self):
+        self.text = ""
+        self._pos = 0
+        # "seek": buscando "content": [ / "array": dentro del arreglo / "done": terminado
+        self._state = "seek"
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._item_start = -1
+
+    def feed(self, chunk: str) -> list:
+        """
+        Añade un fragmento y retorna los objetos JSON (como texto) completados con él.
+
+        Adds a chunk and returns the JSON objects (as text) it completed.
+        """
+        self.text += chunk
+        items = []
+
+        if self._state == "seek":
+            self._seek_array()
+
+        if self._state == "array":
+            self._scan_items(items)
+
+        return items
+
+    def _seek_array(self):
+        """
+        Avanza hasta el "[" que abre el arreglo "content", si ya llegó.
+
+        Advances to the "[" opening the "content" array, if it has arrived.
+        """
+        text = self.text
+        key = text.find('"content"', self._pos)
+
+        if key == -1:
+            # Conserva la cola por si la clave quedó partida entre fragmentos
+            # Keep the tail in case the key was split between chunks
+            self._pos = max(self._pos, len(text) - len('"content"'))
+            return
+
+        i = key + len('"content"')
+        while i < len(text) and text[i] in " \t\r\n:":
+            i += 1
+
+        if i == len(text):
+            self._pos = key
+            return
+
+        if text[i] != "[":
+            # content es texto (p. ej. información insuficiente): no hay elementos que emitir
+            # content is text (e.g. insufficient info): there are no items to emit
+            self._state = "done"
+            return
+
+        self._state = "array"
+        self._pos = i + 1
+
+    def _scan_items(self, items):
+        """
+        Recorre el arreglo desde la última posición acumulando los objetos que se cierran.
+
+        Walks the array from the last position collecting the objects that close.
+        """
+        text = self.text
+
+        for i in range(self._pos, len(text)):
+            char = text[i]
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+
+            elif char == '"':
+                self._in_string = True
+
+            elif char == "{":
+                if self._depth == 0:
+                    self._item_start = i
+                self._depth += 1
+
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    items.append(text[self._item_start:i + 1])
+
+            elif char == "]" and self._depth == 0:
+                self._state = "done"
+                break
+
+        self._pos = len(text)
+
 
 class LLMResponseProcessor:
     """
@@ -41,7 +251,7 @@ class LLMResponseProcessor:
 
     Class responsible for processing and standardizing language model (LLM) responses.
     """
-    __slots__ = ["llm"]
+    __slots__ = ["llm", "_standardized_cache", "_cache_lock", "_structured_chain"]
 
     def __init__(
             self,
@@ -54,6 +264,10 @@ class LLMResponseProcessor:
         """
 
         self.llm = llm
+        # LRU de modelos ya validados y formateados / LRU of already validated and formatted models
+        self._standardized_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._structured_chain = None
     
     def standardize_output(self, raw_response, output_type, missing_info=None,query=""):
         """
@@ -70,6 +284,22 @@ class LLMResponseProcessor:
         Returns:
             str: Respuesta formateada / Formatted response string
         """
+        missing_info = missing_info if isinstance(missing_info, list) else None
+
+        key = hashlib.blake2b(
+            repr((raw_response, output_type, query, tuple(missing_info or ()))).encode("utf-8"),
+            digest_size=16
+        ).digest()
+
+        with self._cache_lock:
+            cached = self._standardized_cache.get(key)
+            if cached is not None:
+                self._standardized_cache.move_to_end(key)
+
+        # En un acierto solo se renueva el timestamp; el contenido ya está validado
+        # On a hit only the timestamp is refreshed; the content is already validated
+        if cached is not None:
+            return cached.model_copy(update={"timestamp": now_ts()}).format_response()
 
         status_map = {
             "requerimientos": "REQUERIMIENTOS_GENERADOS",
@@ -94,23 +324,34 @@ class LLMResponseProcessor:
         response_obj = model_class(
             status=status_value,
             query=query,
-            timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            timestamp=now_ts(),
             content=raw_response,
-            missing_info=missing_info if isinstance(missing_info, list) else None
+            missing_info=missing_info
         )
 
-        return response_obj.format_response()
+        formatted = response_obj.format_response()
+
+        with self._cache_lock:
+            self._standardized_cache[key] = response_obj
+            if len(self._standardized_cache) > STANDARDIZED_CACHE_SIZE:
+                self._standardized_cache.popitem(last=False)
+
+        return formatted
         
     def setup_structured_output(self):
         """
         Configura una cadena LLM para devolver respuestas estructuradas en formato JSON.
+        La cadena se construye una sola vez y se reutiliza en llamadas posteriores.
 
         Sets up an LLM chain to return structured responses in JSON format.
+        The chain is built once and reused on later calls.
         """
+        if self._structured_chain is not None:
+            return self._structured_chain
 
         parser = JsonOutputParser(pydantic_object=RequirementResponse)
 
-        format_instructions = parser.get_format_instructions()
+        format_instructions = REQUIREMENT_FORMAT_INSTRUCTIONS
 
         prompt_template = ChatPromptTemplate.from_messages([
             ("system", 
@@ -121,11 +362,11 @@ class LLMResponseProcessor:
             ("human", "{input}")
         ])
 
-        chain = prompt_template | self.llm | parser
+        self._structured_chain = prompt_template | self.llm | parser
     
-        return chain
+        return self._structured_chain
     
-    def process_llm_response(self, response,query=""):
+    def process_llm_response(self, response,query="", output_type=None):
         """
         Procesa una respuesta del modelo de lenguaje, intentando extraer JSON válido y estandarizarla.
 
@@ -134,6 +375,7 @@ class LLMResponseProcessor:
         Args:
             response (dict): Respuesta cruda del modelo / Raw model response
             query (str): Consulta del usuario / User's original query
+            output_type (str): Tipo esperado ("requerimientos", "epicas", "historias_usuario") / Expected type
 
         Returns:
             str: Respuesta procesada y formateada / Processed, formatted response
@@ -143,6 +385,13 @@ class LLMResponseProcessor:
         try:
             # Extraer JSON de la respuesta
             json_str = self._extract_json_from_response(raw_answer)
+
+            # Si se conoce el tipo, parsear y validar el JSON en una sola pasada
+            # If the type is known, parse and validate the JSON in a single pass
+            if output_type in _RESPONSE_MODELS:
+                formatted = self._validate_json_response(json_str, output_type, query)
+                if formatted is not None:
+                    return formatted
             
             # Procesar los datos JSON
             return self._process_json_response(json_str, raw_answer,query)
@@ -153,49 +402,97 @@ class LLMResponseProcessor:
             output_type, processed_response, missing_info = self._detect_response_type(raw_answer)
             return self.standardize_output(processed_response, output_type, missing_info,query)
 
+    async def stream_items(self, chunks, output_type):
+        """
+        Consume la respuesta del LLM por fragmentos y emite cada elemento de "content"
+        validado en cuanto se completa.
+
+        Consumes the LLM response in chunks and yields each "content" item,
+        validated, as soon as it is complete.
+
+        Args:
+            chunks (AsyncIterator[str]): Fragmentos de texto del LLM / LLM text chunks
+            output_type (str): Tipo esperado / Expected type ("requerimientos", "epicas", "historias_usuario")
+        """
+        item_model = _ITEM_MODELS.get(output_type, RequirementItem)
+        scanner = ContentItemScanner()
+
+        async for chunk in chunks:
+            for fragment in scanner.feed(chunk):
+                try:
+                    yield item_model.model_validate_json(fragment)
+                except ValidationError:
+                    # El elemento se descarta aquí; la respuesta final se valida completa
+                    # The item is skipped here; the final response is validated as a whole
+                    continue
+
     def _extract_json_from_response(self, raw_answer):
         """
         Intenta extraer una estructura JSON desde el texto.
 
         Attempts to extract a JSON structure from the raw answer.
         """
-        json_match = re.search(r'```json\s*(.*?)\s*```', raw_answer, re.DOTALL)
-        
-        if json_match:
-            return json_match.group(1)
+        fence_start = raw_answer.find("```json")
+        scan_from = 0
         
+        if fence_start != -1:
+            fence_end = raw_answer.find("```", fence_start + 7)
+            if fence_end != -1:
+                return raw_answer[fence_start + 7:fence_end].strip()
+
+            # Bloque sin cerrar (respuesta truncada): buscar el objeto dentro del bloque
+            # Unclosed block (truncated response): look for the object inside the block
+            scan_from = fence_start + 7
         
-        json_match = re.search(r'({.*})', raw_answer, re.DOTALL)
-        if json_match:
-            return json_match.group(1)
+        span = _find_json_span(raw_answer, scan_from)
+        if span is not None:
+            return raw_answer[span[0]:span[1]]
         
         raise ValueError("No JSON structure found in response")
 
+    def _validate_json_response(self, json_str, output_type, query=""):
+        """
+        Valida el JSON directamente contra el modelo del tipo esperado (model_validate_json),
+        sin pasar por un dict intermedio. Retorna None si no valida o si su status
+        corresponde a otro modelo, para usar el camino general.
+
+        Validates the JSON directly against the expected type's model (model_validate_json),
+        without an intermediate dict. Returns None when it does not validate or when its
+        status belongs to another model, so the general path is used.
+        """
+        try:
+            response_obj = _RESPONSE_MODELS[output_type].model_validate_json(json_str)
+        except ValidationError:
+            return None
+
+        if self._infer_output_type_from_status(response_obj.status) != output_type:
+            return None
+
+        response_obj = response_obj.model_copy(update={
+            "query": query,
+            "timestamp": now_ts(),
+            "metadata": None
+        })
+
+        return response_obj.format_response()
+
     def _process_json_response(self, json_str, raw_answer,query=""):
         """
         Convierte un string JSON en una respuesta estructurada.
 
         Converts a JSON string into a structured response.
         """
-        structured_data = json.loads(json_str)
-        
-        complete_data = {
-            "status": "RESPUESTA_GENERAL",  
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "content": structured_data["content"] if "content" in structured_data else raw_answer,
-            "missing_info": structured_data["missing_info"] if "missing_info" in structured_data else None,
-            "metadata": structured_data["metadata"] if "metadata" in structured_data else None
-        }
+        structured_data = _json_loads(json_str)
         
-        # Determinar el status adecuado
-        status = self._determine_response_status(structured_data, structured_data.get("content", ""))
+        # Determinar el status adecuado y la información faltante en un solo paso
+        status, missing_info = self._classify_and_extract(structured_data, structured_data.get("content", ""))
 
         output_type = self._infer_output_type_from_status(status)
 
         return self.standardize_output(
             structured_data.get("content", raw_answer),
             output_type=output_type,
-            missing_info=structured_data.get("missing_info", None),
+            missing_info=missing_info,
             query=query
         )
     
@@ -209,53 +506,47 @@ class LLMResponseProcessor:
         }
         return mapping.get(status.upper(), "requerimientos")  # fallback seguro
 
-    def _determine_response_status(self, structured_data, content):
+    def _classify_and_extract(self, structured_data, content):
         """
-        Determina el estado de una respuesta basada en su contenido.
+        Determina el estado de la respuesta y, si falta información que no venga como lista,
+        la extrae del contenido en el mismo paso.
+
+        Determines the response status and, when missing info does not come as a list,
+        extracts it from the content in the same step.
 
-        Determines the response status based on its content.
+        Returns:
+            tuple: (status, missing_info)
         """
+        missing_info = structured_data.get("missing_info")
 
         if "status" in structured_data:
-            return structured_data["status"]
-        
-        content_lower = content.lower()
-        if "información insuficiente" in content_lower or "necesito más información" in content_lower:
-            return "INFORMACION_INSUFICIENTE"
-        
-        elif "error" in content_lower:
-            return "ERROR_PROCESAMIENTO"
-        
-        elif "requerimiento" in content_lower or "requisito" in content_lower:
-            return "REQUERIMIENTOS_GENERADOS"
-        
-        elif "epicas" in content_lower or "epica" in content_lower:
-            return "EPICAS_GENERADAS"
-        
-        elif "historias_usuario" in content_lower or "historias_usuario" in content_lower:
-            return "HISTORIAS_GENERADAS"
+            status = structured_data["status"]
 
-        return "RESPUESTA_GENERAL"
+        else:
+            found = _find_keywords(content) if isinstance(content, str) else set()
 
-    def _handle_missing_info(self, complete_data):
-        """
-        Procesa respuestas con información faltante que no esté en formato de lista.
+            if found & _INSUFFICIENT_KEYWORDS:
+                status = "INFORMACION_INSUFICIENTE"
+            
+            elif "error" in found:
+                status = "ERROR_PROCESAMIENTO"
+            
+            elif found & {"requerimiento", "requerimientos", "requisito"}:
+                status = "REQUERIMIENTOS_GENERADOS"
+            
+            elif "epica" in found or "epicas" in found:
+                status = "EPICAS_GENERADAS"
+            
+            elif "historias_usuario" in found:
+                status = "HISTORIAS_GENERADAS"
 
-        Processes missing info responses when it's not already in list form.
-        """
+            else:
+                status = "RESPUESTA_GENERAL"
 
-        if complete_data["status"] == "INFORMACION_INSUFICIENTE" and not isinstance(complete_data["missing_info"], list):
-            
-            if isinstance(complete_data["content"], str):
-                content_items = re.findall(r'(?:^|\n)\s*(?:\d+\.|\*|\-)\s*(.+?)(?:\n|$)', complete_data["content"])
-                
-                if content_items:
-                    complete_data["missing_info"] = content_items
-                
-                else:
-                    complete_data["missing_info"] = ["Se requieren más detalles sobre el proyecto"]
-        
-        return complete_data
+        if status == "INFORMACION_INSUFICIENTE" and not isinstance(missing_info, list) and isinstance(content, str):
+            missing_info = _LIST_ITEM_RE.findall(content) or ["Se requieren más detalles sobre el proyecto"]
+
+        return status, missing_info
 
     def _detect_response_type(self, raw_response):
         """
@@ -269,38 +560,42 @@ class LLMResponseProcessor:
         Returns:
             tuple: (output_type, processed_response, missing_info)
         """
-        lower_response = raw_response.lower()
+        found = _find_keywords(raw_response)
+        output_type = "general"
         missing_info = None
         
-        if "información insuficiente" in lower_response or "necesito más información" in lower_response:
+        if found & _INSUFFICIENT_KEYWORDS:
             output_type = "missing_info"
-            missing_info = self._extract_missing_info(lower_response)
+            missing_info = self._extract_missing_info(raw_response.lower())
 
-        elif "error" in lower_response and ("procesar" in lower_response or "procesamiento" in lower_response):
+        elif "error" in found and ("procesar" in found or "procesamiento" in found):
             output_type = "error"
 
-        elif "requerimientos" in lower_response or "requirements" in lower_response:
+        elif "requerimientos" in found or "requirements" in found:
             output_type = "requerimientos"
         
-        elif "epicas" in lower_response or "epics" in lower_response:
+        elif "epicas" in found or "epics" in found:
             output_type = "epicas"
 
-        elif "historias_usuario" in lower_response or "historias_usuario" in lower_response:
+        elif "historias_usuario" in found:
             output_type = "historias_usuario"
          
         return output_type, raw_response, missing_info
 
     def _extract_missing_info(self, lower_response):
         """Extrae la información faltante de una respuesta"""
-        missing_pattern = re.compile(r'(?:necesito|falta)(?:.*?)(?:información|detalles)(.*?)(?:$|(?:para generar))', re.DOTALL)
-        match = missing_pattern.search(lower_response)
+        match = _MISSING_RE.search(lower_response)
         
         if match:
             raw_missing = match.group(1).strip()
-            list_items = re.findall(r'(?:^|\n)\s*(?:\d+\.|\*|\-)\s*(.+?)(?:\n|$)', raw_missing)
+            list_items = _LIST_ITEM_RE.findall(raw_missing)
 
             if not list_items:  
-                list_items = [item.strip() for item in re.split(r'(?:\.|;|\n)', raw_missing) if item.strip()]
+                for line in raw_missing.splitlines():
+                    for fragment in line.replace(";", ".").split("."):
+                        fragment = fragment.strip()
+                        if fragment:
+                            list_items.append(fragment)
             
             if list_items:
                 return list_items
@@ -1,34 +1,34 @@
 import os
-import dotenv
-
-from .conversation_manager import ConversationManager
-from langchain_google_genai import ChatGoogleGenerativeAI
+from functools import lru_cache
 
+import dotenv
 
-dotenv.load_dotenv()
+# Solo se lee el .env si la clave no viene ya en el entorno (p. ej. heredada por los workers).
+# Va antes de importar .assistant, que lee la configuración al importarse.
+if not os.getenv("GEMINI_API_KEY"):
+    dotenv.load_dotenv()
 Key = os.environ.get("GEMINI_API_KEY")
 
+from .assistant import Assistant
+from langchain_google_genai import ChatGoogleGenerativeAI
 
-# Configura un LLM compartido
-shared_llm = ChatGoogleGenerativeAI(
-    api_key=Key,
-    model="gemini-2.0-flash",
-    temperature=0.2,
-    max_tokens=None,
-    timeout=None,
-)
 
-# Crea un conversation_manager independiente (sin document_manager)
-# Modifica tu ConversationManager para que acepte el document_manager después
-class SharedConversationManager(ConversationManager):
-    def __init__(self, llm):
-        self.llm = llm
-        self.document_manager = None
-        self.conversations = {}
-        self.load_conversation_histories()
-        
-    def set_document_manager(self, document_manager):
-        """Actualiza el document_manager según el contexto"""
-        self.document_manager = document_manager
+# Configura un LLM compartido, creado una sola vez por proceso
+@lru_cache(maxsize=1)
+def get_shared_llm():
+    return ChatGoogleGenerativeAI(
+        api_key=Key,
+        model="gemini-2.0-flash",
+        temperature=0.2,
+        max_tokens=None,
+        timeout=None,
+    )
 
-shared_conversation_manager = SharedConversationManager(llm=shared_llm)
\ No newline at end of file
+# Un asistente por subdirectorio de documentos, compartido por todos los routers del proceso.
+# Cada asistente crea su propio ConversationManager ligado a su document_manager.
+@lru_cache(maxsize=None)
+def get_assistant(subdirectory: str):
+    return Assistant(
+        subdirectory=subdirectory,
+        llm=get_shared_llm()
+    )
\ No newline at end of file
@@ -34,6 +34,7 @@ class ThinkingSteps:
     __slots__ = ["callback",
                  "steps",
                  "_current_step",
+                 "_silent",
                  ]
     
     def __init__(self, callback: Optional[Callable[[str], None]] = None):
@@ -49,9 +50,27 @@ class ThinkingSteps:
                                            Optional function to be called at each step.
                                            If not provided, it will print to the console.
         """
-        self.callback = callback or self._default_callback
+        # Sin callback y sin terminal (p. ej. bajo uvicorn) nadie ve los pasos: no se imprime ni se espera
+        # Without a callback or a terminal (e.g. under uvicorn) nobody sees the steps: no printing or waiting
+        self._silent = callback is None and not sys.stdout.isatty()
+
+        if callback is not None:
+            self.callback = callback
+        elif self._silent:
+            self.callback = self._silent_callback
+        else:
+            self.callback = self._default_callback
+
         self.steps = []
         self._current_step = None
+
+    @staticmethod
+    def _silent_callback(message: str):
+        """
+        Callback vacío usado cuando la salida no es una terminal.
+
+        No-op callback used when output is not a terminal.
+        """
     
     def _default_callback(self, message: str):
         """
@@ -62,7 +81,7 @@ class ThinkingSteps:
         sys.stdout.write(f"\r{message}")
         sys.stdout.flush()
     
-    async def add_step(self, message: str, duration: float = 1.0):
+    async def add_step(self, message: str, duration: float = 0.0):
         """
         Añade un nuevo paso de pensamiento, muestra el mensaje y espera un tiempo determinado.
 
@@ -70,13 +89,15 @@ class ThinkingSteps:
 
         Args:
             message (str): Mensaje del paso a mostrar / Step message to display.
-            duration (float): Tiempo de espera en segundos / Delay time in seconds.
+            duration (float): Tiempo de espera en segundos, 0 sin espera / Delay time in seconds, 0 for none.
         """
         full_message = f"⚙️ {message}..."
         self.steps.append(full_message)
         self._current_step = full_message
         self.callback(full_message)
-        await asyncio.sleep(duration)
+
+        if duration > 0 and not self._silent:
+            await asyncio.sleep(duration)
     
     async def complete(self, final_message: str = "✅ Respuesta generada!"):
         """
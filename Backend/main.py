@@ -16,5 +16,20 @@ app = create_app()
 
 
 if __name__ == "__main__":
+    import os
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8005, reload=True)
\ No newline at end of file
+
+    # DEV_RELOAD=1 activa la recarga en desarrollo; en producción se usan WEB_CONCURRENCY workers
+    reload = os.getenv("DEV_RELOAD", "0") == "1"
+    workers = 1 if reload else int(os.getenv("WEB_CONCURRENCY", "1"))
+
+    # loop/http "auto" usan uvloop y httptools cuando están instalados (no disponibles en Windows)
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8005,
+        reload=reload,
+        workers=workers,
+        loop="auto",
+        http="auto"
+    )
\ No newline at end of file
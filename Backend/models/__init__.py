@@ -1,5 +1,5 @@
 #La carpeta de models es para crear las 'Clases' que representarian la data que recibimos o enviamos
 from .ai_conversation_models import RequestBody, ChatMessage, ChatResponse, AddContentRequest, EpicRequestBody, StoryRequestBody
-from .ai_requirement_model import RequirementResponse
-from .ai_epics_model import EpicResponse
-from .ai_userstory_model import UserStoryResponse
\ No newline at end of file
+from .ai_requirement_model import RequirementResponse, RequirementItem, REQUIREMENT_FORMAT_INSTRUCTIONS
+from .ai_epics_model import EpicResponse, EpicItem, EPIC_FORMAT_INSTRUCTIONS
+from .ai_userstory_model import UserStoryResponse, UserStoryItem, USER_STORY_FORMAT_INSTRUCTIONS
\ No newline at end of file
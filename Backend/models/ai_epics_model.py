@@ -2,14 +2,19 @@ import json
 import re
 from langchain_core.output_parsers import JsonOutputParser
 from typing import Literal, Optional, Dict, List,Union
-from datetime import datetime
-from pydantic import BaseModel, Field
+from utils.timestamps import now_ts
+from pydantic import BaseModel, ConfigDict, Field
+
+# IDs precalculados para respuestas típicas / Precomputed IDs for typical responses
+_EPIC_IDS = tuple(f"EPIC-{i:03d}" for i in range(256))
 
 class RelatedRequirement(BaseModel):
     id: str
     description: str
 
 class EpicItem(BaseModel):
+    model_config = ConfigDict(extra="ignore", validate_assignment=False)
+
     id: str
     title: str
     description: str
@@ -18,12 +23,14 @@ class EpicItem(BaseModel):
 class EpicResponse(BaseModel):
     """Modelo para respuestas estructuradas del asistente de proyectos."""
     
+    model_config = ConfigDict(extra="ignore", validate_assignment=False)
+
     status: Literal["EPICAS_GENERADAS", "INFORMACION_INSUFICIENTE", "ERROR_PROCESAMIENTO", "RESPUESTA_GENERAL"] = Field(
         description="Estado de la respuesta generada"
     )
     query: str = Field(default="", description="Consulta original del usuario")
     timestamp: str = Field(
-        default_factory=lambda: datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        default_factory=now_ts,
         description="Momento en que se generó la respuesta"
     )
     content: Union[List[EpicItem], str] = Field(
@@ -40,29 +47,41 @@ class EpicResponse(BaseModel):
 
 
     def _format_epics(self, epics: List[Union[EpicItem, Dict]]) -> List[EpicItem]:
-        formatted = []
+        formatted = [None] * len(epics)
 
-        for i, epic in enumerate(epics, 1):
-            item = EpicItem(**epic) if isinstance(epic, dict) else epic
+        for i, epic in enumerate(epics):
+            epic_id = _EPIC_IDS[i + 1] if i + 1 < 256 else f"EPIC-{i + 1:03d}"
 
-            item = item.model_copy(update={"id": f"EPIC-{i:03d}"})
+            if isinstance(epic, dict):
+                # Diccionario crudo: se valida (incluidos sus requerimientos relacionados) antes de renumerarlo
+                # Raw dict: validated (including its related requirements) before renumbering it
+                formatted[i] = EpicItem.model_validate(epic).model_copy(update={"id": epic_id})
+                continue
 
-            related = item.related_requirements or []
             fixed_related = [
-                RelatedRequirement(**r) if isinstance(r, dict) else r
-                for r in related
+                RelatedRequirement.model_construct(**r) if isinstance(r, dict) else r
+                for r in epic.related_requirements or []
             ]
 
-            item = item.model_copy(update={"related_requirements": fixed_related})
-            formatted.append(item)
+            formatted[i] = EpicItem.model_construct(
+                id=epic_id,
+                title=epic.title,
+                description=epic.description,
+                related_requirements=fixed_related
+            )
 
         return formatted
 
 
-    def format_response(self) -> str:
+    def format_response(self, indent: Optional[int] = None) -> str:
         """
         Aplica el formateo de IDs si el contenido es una lista y devuelve el JSON formateado.
+        Por defecto compacto; indent solo para depuración.
         """
         if isinstance(self.content, list):
             self.content = self._format_epics(self.content)
-        return self.model_dump_json(indent=4)
+        return self.model_dump_json(indent=indent)
+
+
+# Instrucciones de formato calculadas una sola vez al importar / Format instructions computed once at import
+EPIC_FORMAT_INSTRUCTIONS = JsonOutputParser(pydantic_object=EpicResponse).get_format_instructions()
\ No newline at end of file
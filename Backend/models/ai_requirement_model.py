@@ -2,10 +2,40 @@ import json
 import re
 from langchain_core.output_parsers import JsonOutputParser
 from typing import Literal, Optional, Dict, List,Union
-from datetime import datetime
-from pydantic import BaseModel, Field
+from utils.timestamps import now_ts
+from pydantic import BaseModel, ConfigDict, Field
+
+# IDs precalculados para respuestas típicas / Precomputed IDs for typical responses
+_REQ_IDS = tuple(f"REQ-{i:03d}" for i in range(256))
+_REQ_NF_IDS = tuple(f"REQ-NF-{i:03d}" for i in range(256))
+
+_DIGITS_RE = re.compile(r'\d+')
+_NF_RE = re.compile(r'\bno funcional\b|\bnf\b', re.IGNORECASE)
+
+
+def _requirement_id(item, position: int) -> str:
+    """
+    Calcula el ID normalizado (REQ-### o REQ-NF-###) a partir del número del ID original
+    o, si no tiene, de la posición del requerimiento.
+
+    Computes the normalized ID (REQ-### or REQ-NF-###) from the number in the original ID
+    or, if it has none, from the requirement's position.
+    """
+    raw_id = item.id if isinstance(item.id, str) else str(item.id)
+    if raw_id.isdecimal():
+        num = int(raw_id)
+    else:
+        num_match = _DIGITS_RE.search(raw_id)
+        num = int(num_match.group()) if num_match else position
+
+    if _NF_RE.search(item.category):
+        return _REQ_NF_IDS[num] if 0 <= num < 256 else f"REQ-NF-{num:03d}"
+
+    return _REQ_IDS[num] if 0 <= num < 256 else f"REQ-{num:03d}"
 
 class RequirementItem(BaseModel):
+    model_config = ConfigDict(extra="ignore", validate_assignment=False)
+
     id: str
     title: str
     description: str
@@ -16,12 +46,14 @@ class RequirementItem(BaseModel):
 class RequirementResponse(BaseModel):
     """Modelo para respuestas estructuradas del asistente de proyectos."""
     
+    model_config = ConfigDict(extra="ignore", validate_assignment=False)
+
     status: Literal["REQUERIMIENTOS_GENERADOS", "INFORMACION_INSUFICIENTE", "ERROR_PROCESAMIENTO", "RESPUESTA_GENERAL"] = Field(
         description="Estado de la respuesta generada"
     )
     query: str = Field(default="", description="Consulta original del usuario")
     timestamp: str = Field(
-        default_factory=lambda: datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        default_factory=now_ts,
         description="Momento en que se generó la respuesta"
     )
     content: Union[List[RequirementItem], str] = Field(
@@ -37,26 +69,19 @@ class RequirementResponse(BaseModel):
     )
 
     def _format_requirements(self, requirements: List[Union[RequirementItem, Dict]]) -> List[RequirementItem]:
-        formatted = []
-        for i, req in enumerate(requirements, 1):
-            item = RequirementItem(**req) if isinstance(req, dict) else req
+        items = [RequirementItem(**req) if isinstance(req, dict) else req for req in requirements]
 
-            raw_id = item.id
-            try:
-                num = int(raw_id)
-            except (ValueError, TypeError):
-                num_match = re.search(r'\d+', str(raw_id))
-                num = int(num_match.group()) if num_match else i
+        return [
+            RequirementItem.model_construct(**{**item.__dict__, "id": _requirement_id(item, i)})
+            for i, item in enumerate(items, 1)
+        ]
 
-            category = item.category.lower()
-            item.id = f"REQ-NF-{num:03d}" if "no funcional" in category or "nf" in category else f"REQ-{num:03d}"
-            formatted.append(item)
 
-        return formatted
-
-
-    def format_response(self) -> str:
+    def format_response(self, indent: Optional[int] = None) -> str:
         if isinstance(self.content, list):
             self.content = self._format_requirements(self.content)
-        return self.model_dump_json(indent=4, exclude_none=True)
+        return self.model_dump_json(indent=indent, exclude_none=True)
+
 
+# Instrucciones de formato calculadas una sola vez al importar / Format instructions computed once at import
+REQUIREMENT_FORMAT_INSTRUCTIONS = JsonOutputParser(pydantic_object=RequirementResponse).get_format_instructions()
\ No newline at end of file
@@ -1,8 +1,12 @@
-from pydantic import BaseModel, Field
+from langchain_core.output_parsers import JsonOutputParser
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Literal, Optional, Dict, List, Union
-from datetime import datetime
+from utils.timestamps import now_ts
 
 class UserStoryItem(BaseModel):
+    # Inmutable: las historias se construyen una vez y solo se leen después
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
     id: str
     title: str
     description: str
@@ -10,6 +14,23 @@ class UserStoryItem(BaseModel):
     assigned_epic: str
     acceptance_criteria: List[str]
 
+
+def _user_story_fields(story, position: int) -> dict:
+    """
+    Campos de la historia con su ID US-### y acceptance_criteria garantizado como lista.
+
+    Story fields with its US-### ID and acceptance_criteria guaranteed to be a list.
+    """
+    fields = story if isinstance(story, dict) else story.__dict__
+    criteria = fields.get("acceptance_criteria")
+
+    return {
+        **fields,
+        "id": f"US-{position:03d}",
+        "acceptance_criteria": criteria if isinstance(criteria, list) else []
+    }
+
+
 class UserStoryResponse(BaseModel):
     """Modelo para respuestas estructuradas de historias de usuario generadas por IA."""
 
@@ -18,7 +39,7 @@ class UserStoryResponse(BaseModel):
     )
     query: str = Field(default="", description="Consulta original del usuario")
     timestamp: str = Field(
-        default_factory=lambda: datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        default_factory=now_ts,
         description="Momento en que se generó la respuesta"
     )
     content: Union[List[UserStoryItem], str] = Field(
@@ -34,25 +55,14 @@ class UserStoryResponse(BaseModel):
     )
 
     def _format_user_stories(self, stories: List[Union[UserStoryItem, Dict]]) -> List[UserStoryItem]:
-        formatted = []
-
-        for i, story in enumerate(stories, 1):
-            item = UserStoryItem(**story) if isinstance(story, dict) else story
+        # Ya validado por el parser del LLM: se construye sin revalidar
+        return [UserStoryItem.model_construct(**_user_story_fields(story, i)) for i, story in enumerate(stories, 1)]
 
-            # Asegurar que acceptance_criteria sea lista
-            criteria = item.acceptance_criteria if isinstance(item.acceptance_criteria, list) else []
-
-            # Actualizar campos
-            item = item.model_copy(update={
-                "id": f"US-{i:03d}",
-                "acceptance_criteria": criteria
-            })
-
-            formatted.append(item)
-
-        return formatted
-
-    def format_response(self) -> str:
+    def format_response(self, indent: Optional[int] = None) -> str:
         if isinstance(self.content, list):
             self.content = self._format_user_stories(self.content)
-        return self.model_dump_json(indent=4)
+        return self.model_dump_json(indent=indent)
+
+
+# Instrucciones de formato calculadas una sola vez al importar / Format instructions computed once at import
+USER_STORY_FORMAT_INSTRUCTIONS = JsonOutputParser(pydantic_object=UserStoryResponse).get_format_instructions()
\ No newline at end of file
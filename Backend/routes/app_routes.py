@@ -2,9 +2,10 @@
 
 # Third-party imports
 from fastapi import APIRouter
+from fastapi.responses import ORJSONResponse
 # Local application imports
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 @router.get("/")
 def read_root():
@@ -1,31 +1,31 @@
 # Standard library imports
 import asyncio 
 import os
-from datetime import datetime
-import json
+from itertools import chain
 from typing import List, Dict
 # Third-party imports
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, Response
 from pydantic import BaseModel
+import orjson
 # Local application imports
-from ia import Assistant,shared_llm,shared_conversation_manager
-from utils import Prompts, Formats, translate_selected_fields
+from ia import get_assistant
+from utils import DEFAULT_PROMPTS, Formats, translate_selected_fields, now_ts
 from models import EpicRequestBody 
 
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
-EpicsGenerativeAI = Assistant(
-    subdirectory='epics_pdfs',
-    conversation_manager=shared_conversation_manager,
-    llm=shared_llm
-)
+# Instancia de la IA con los documentos de épicas, creada al importar como en las demás rutas
+EpicsGenerativeAI = get_assistant('epics_pdfs')
 
-EpicsPrompt = Prompts()
+EpicsPrompt = DEFAULT_PROMPTS
 
 JSONOutputFormater = Formats()
 
+# Máximo de llamadas simultáneas al LLM por solicitud (límites de cuota del proveedor)
+EPIC_CONCURRENCY = int(os.environ.get("EPIC_CONCURRENCY", 4))
+
 """
 Generar epicas 
 """
@@ -40,29 +40,39 @@ async def generate_epics(body: EpicRequestBody):
 
         requirement_chunks = JSONOutputFormater.split_content(all_requirements, chunk_size=5)
 
-        all_epics = []
+        semaphore = asyncio.Semaphore(EPIC_CONCURRENCY)
+
+        preprompt_text = EpicsPrompt.getEPICprompt()
 
-        for chunk in requirement_chunks:
-            prompt_input = JSONOutputFormater.format_requirements_for_prompt(chunk)
+        async def generate_chunk(index, chunk):
+            async with semaphore:
+                partial_epics = await EpicsGenerativeAI.generate_content(
+                    query=JSONOutputFormater.format_requirements_for_prompt(chunk),
+                    preprompt=preprompt_text,
+                    session_id=body.session_id,
+                    type="epicas",
+                    newchat=False
+                )
+            parsed = orjson.loads(partial_epics)
+            return index, parsed["content"] if isinstance(parsed.get("content"), list) else []
 
-            partial_epics = await EpicsGenerativeAI.generate_content(
-                query=prompt_input,
-                preprompt=EpicsPrompt.getEPICprompt(),
-                session_id=body.session_id,
-                type="epicas",
-                newchat=False
-            )
+        # Cada fragmento se parsea en cuanto termina; el índice conserva el orden original
+        epics_by_chunk = [None] * len(requirement_chunks)
+        for next_chunk in asyncio.as_completed([generate_chunk(i, chunk) for i, chunk in enumerate(requirement_chunks)]):
+            index, content = await next_chunk
+            epics_by_chunk[index] = content
 
-            parsed = json.loads(partial_epics)
-            if isinstance(parsed.get("content"), list):
-                all_epics.extend(parsed["content"])
+        all_epics = list(chain.from_iterable(epics_by_chunk))
 
         response = JSONOutputFormater.fix_content_ids(all_epics,"epic")
 
+        # Un solo timestamp para la respuesta y su entrada de historial
+        timestamp = now_ts()
+
         final_response = {
             "status": "EPICAS_GENERADOS",
             "query": requirement_chunks,
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "timestamp": timestamp,
             "content": response,
             "missing_info": None,
             "metadata": None
@@ -70,25 +80,23 @@ async def generate_epics(body: EpicRequestBody):
 
         lang = body.lang
         if lang:
-            final_response = translate_selected_fields(final_response, target_lang=lang)
+            # La traducción hace llamadas de red bloqueantes: se ejecuta fuera del event loop
+            final_response = await asyncio.to_thread(translate_selected_fields, final_response, target_lang=lang, inplace=True)
 
-        final_response_text = json.dumps(final_response, indent=4, ensure_ascii=False)
-        
-        EpicsGenerativeAI.conversation_manager.load_conversation_histories()
-            
+        # Una sola serialización para el historial y para el cliente; el diccionario queda solo en raw_response
+        final_response_bytes = orjson.dumps(final_response)
 
-        EpicsGenerativeAI.conversation_manager.conversations[body.session_id]["history"].append(
+        await EpicsGenerativeAI.conversation_manager.record_interaction(
+            body.session_id,
             {
                 "query": str(requirement_chunks),
-                "response":final_response_text,
-                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "response":final_response_bytes.decode(),
+                "timestamp": timestamp,
                 "raw_response": final_response
             }
         )
 
-        EpicsGenerativeAI.conversation_manager.auto_save_history(body.session_id)
-
-        return JSONResponse(content=final_response, status_code=200)
+        return Response(content=final_response_bytes, media_type="application/json", status_code=200)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
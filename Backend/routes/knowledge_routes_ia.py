@@ -1,28 +1,28 @@
 from typing import Optional
+import asyncio
 
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 
 
-from ia import Assistant
+from ia import get_assistant
 from models import AddContentRequest
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 
-GenerativeAI = Assistant(
-    subdirectory = ''
-)
+GenerativeAI = get_assistant('')
     
 @router.post("/knowledge/add")
 async def add_to_knowledge_base(request: AddContentRequest):
     try:
-        chunks_added = GenerativeAI.document_manager.add_content_to_knowledge_base(
+        chunks_added = await asyncio.to_thread(
+            GenerativeAI.document_manager.add_content_to_knowledge_base,
             content=request.content,
             source_name=request.source_name
         )
         
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "message": f"Contenido añadido a la base de conocimientos. Se crearon {chunks_added} fragmentos.",
             "chunks_added": chunks_added
         }, status_code=200)
@@ -53,12 +53,13 @@ async def learn_from_response(
         if not save_as:
             save_as = f"learned_{session_id}_{response_index}.txt"
         
-        chunks_added = GenerativeAI.document_manager.add_content_to_knowledge_base(
+        chunks_added = await asyncio.to_thread(
+            GenerativeAI.document_manager.add_content_to_knowledge_base,
             content=content,
             source_name=save_as
         )
         
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "message": f"Respuesta añadida a la base de conocimientos. Se crearon {chunks_added} fragmentos.",
             "content": content,
             "file": save_as
@@ -1,35 +1,45 @@
 #Standard library imports
 import asyncio 
+import hashlib
 import os
 import uuid
 from typing import Optional, List, Dict
-import json
-from datetime import datetime
 # Third-party imports
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
+import orjson
+from cachetools import TTLCache
 
 
 # Local application imports
-from ia import Assistant,shared_llm,shared_conversation_manager
+from ia import get_assistant
 from models import RequestBody, ChatResponse, AddContentRequest, ChatMessage
-from utils import Prompts, Formats,translate_selected_fields
+from utils import DEFAULT_PROMPTS, Formats,translate_selected_fields, now_ts
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 # Instancia de la IA con los documentos de requerimientos
-RequirementsGenerativeAI = Assistant(
-    subdirectory = 'requirements_pdfs',
-    conversation_manager=shared_conversation_manager,
-    llm=shared_llm
-)
+RequirementsGenerativeAI = get_assistant('requirements_pdfs')
 
-RequirementsPrompt = Prompts()
+RequirementsPrompt = DEFAULT_PROMPTS
 Fprompt,NFprompt = RequirementsPrompt.getREQprompt()
 
 JSONOutputFormater = Formats()
 
+# Respuestas (funcional, no funcional) de conversaciones nuevas, por hash de prompts y mensaje.
+# Solo se cachean conversaciones nuevas: con historial la respuesta depende de la sesión.
+CHAT_CACHE_TTL = int(os.environ.get("CHAT_CACHE_TTL", 3600))
+_chat_cache = TTLCache(maxsize=256, ttl=CHAT_CACHE_TTL)
+
+
+def _chat_cache_key(text: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (Fprompt, NFprompt, text):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
 
 @router.post("/chat", response_model=ChatResponse)
 async def chat(message: ChatMessage):
@@ -42,50 +52,59 @@ async def chat(message: ChatMessage):
         new_conversation = False  
 
     try:
-        functional_response = await RequirementsGenerativeAI.generate_content(
-            query=message.message,
-            preprompt=Fprompt,
-            session_id=session_id,
-            newchat=new_conversation,
-            type="requerimientos"
-        )
-
-        non_functional_response = await RequirementsGenerativeAI.generate_content(
-            query=message.message,
-            preprompt=NFprompt,
-            session_id=session_id,
-            newchat=new_conversation,
-            type="requerimientos"
-        )
-
+        cache_key = _chat_cache_key(message.message) if new_conversation else None
+        cached = _chat_cache.get(cache_key) if cache_key else None
+
+        if cached:
+            functional_response, non_functional_response = cached
+        else:
+            # Ambas llamadas solo leen la sesión (el historial se escribe abajo), así que pueden ir en paralelo
+            functional_response, non_functional_response = await asyncio.gather(
+                RequirementsGenerativeAI.generate_content(
+                    query=message.message,
+                    preprompt=Fprompt,
+                    session_id=session_id,
+                    newchat=new_conversation,
+                    type="requerimientos"
+                ),
+                RequirementsGenerativeAI.generate_content(
+                    query=message.message,
+                    preprompt=NFprompt,
+                    session_id=session_id,
+                    newchat=new_conversation,
+                    type="requerimientos"
+                )
+            )
+            if cache_key:
+                _chat_cache[cache_key] = (functional_response, non_functional_response)
+
+        # Un solo timestamp para la respuesta y su entrada de historial
+        timestamp = now_ts()
         responsejson = JSONOutputFormater.merge_responses(f_response=functional_response,
-                                                          nf_response=non_functional_response
+                                                          nf_response=non_functional_response,
+                                                          timestamp=timestamp
                                                             )
 
+        # Sin idioma destino la respuesta se devuelve tal cual
+        final_response = responsejson
         lang = message.lang
         if lang:
-            final_response = translate_selected_fields(responsejson, target_lang=lang)
-
-        response_text = json.dumps(final_response["content"],
-                                    indent=4,
-                                    ensure_ascii=False
-                                    )
-        RequirementsGenerativeAI.conversation_manager.load_conversation_histories()
+            # La traducción hace llamadas de red bloqueantes: se ejecuta fuera del event loop
+            final_response = await asyncio.to_thread(translate_selected_fields, responsejson, target_lang=lang)
 
-        RequirementsGenerativeAI.conversation_manager.conversations[session_id]["history"].append(
+        await RequirementsGenerativeAI.conversation_manager.record_interaction(
+            session_id,
             {
                 "query":message.message,
-                "response":response_text,
-                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "response":final_response["content"],
+                "timestamp": timestamp,
                 "raw_response": responsejson
             }
         )
 
-        RequirementsGenerativeAI.conversation_manager.auto_save_history(session_id)
-
         
         return ChatResponse(
-            message=responsejson,
+            message=final_response,
             session_id=session_id,
         )
     
@@ -93,11 +112,103 @@ async def chat(message: ChatMessage):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/chat/stream")
+async def chat_stream(message: ChatMessage):
+    """
+    Igual que /chat, pero responde en NDJSON: una línea por requerimiento en cuanto se genera
+    y una línea final con la respuesta completa.
+
+    Same as /chat, but responds with NDJSON: one line per requirement as soon as it is generated
+    and a final line with the complete response.
+    """
+    if not message.session_id:
+        session_id = str(uuid.uuid4())
+        new_conversation = True
+    else:
+        session_id = message.session_id
+        new_conversation = False
+
+    async def drain(kind, preprompt, queue):
+        # Reenvía los eventos de un stream a la cola compartida; None marca el final
+        try:
+            async for event, payload in RequirementsGenerativeAI.stream_content(
+                query=message.message,
+                preprompt=preprompt,
+                session_id=session_id,
+                newchat=new_conversation,
+                type="requerimientos"
+            ):
+                await queue.put((kind, event, payload))
+        finally:
+            await queue.put(None)
+
+    async def event_stream():
+        queue = asyncio.Queue()
+        producers = [
+            asyncio.create_task(drain(kind, preprompt, queue))
+            for kind, preprompt in (("functional", Fprompt), ("non_functional", NFprompt))
+        ]
+
+        try:
+            responses = {}
+
+            # Ambos streams se consumen a la vez: los elementos salen en el orden en que se completan
+            finished = 0
+            while finished < len(producers):
+                entry = await queue.get()
+                if entry is None:
+                    finished += 1
+                    continue
+
+                kind, event, payload = entry
+                if event == "item":
+                    yield orjson.dumps({"event": "item", "kind": kind, "data": payload.model_dump()}) + b"\n"
+                else:
+                    responses[kind] = payload
+
+            # Propaga el primer error de los productores, si lo hubo
+            for producer in producers:
+                producer.result()
+
+            timestamp = now_ts()
+            responsejson = JSONOutputFormater.merge_responses(f_response=responses["functional"],
+                                                              nf_response=responses["non_functional"],
+                                                              timestamp=timestamp
+                                                                )
+
+            if message.lang:
+                responsejson = await asyncio.to_thread(translate_selected_fields, responsejson, target_lang=message.lang)
+
+            await RequirementsGenerativeAI.conversation_manager.record_interaction(
+                session_id,
+                {
+                    "query":message.message,
+                    "response":responsejson["content"],
+                    "timestamp": timestamp,
+                    "raw_response": responsejson
+                }
+            )
+
+            yield orjson.dumps({"event": "done", "session_id": session_id, "message": responsejson}) + b"\n"
+
+        except Exception as e:
+            # Los encabezados ya se enviaron: el error viaja como última línea
+            # Headers were already sent: the error travels as the last line
+            yield orjson.dumps({"event": "error", "detail": str(e)}) + b"\n"
+
+        finally:
+            # Si el cliente se desconecta, no se sigue generando en segundo plano
+            for producer in producers:
+                producer.cancel()
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+
 @router.get("/chat/history/{session_id}")
 async def get_chat_history(session_id: str):
     try:
         history = RequirementsGenerativeAI.conversation_manager.get_conversation_history(session_id)
-        return JSONResponse(content={"history": history}, status_code=200)
+        return ORJSONResponse(content={"history": history}, status_code=200)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
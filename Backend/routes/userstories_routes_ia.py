@@ -1,85 +1,125 @@
+import asyncio
+import hashlib
+import os
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, Response
 from pydantic import BaseModel
-from datetime import datetime
 from typing import Dict, List
-import json
-from ia import Assistant, shared_conversation_manager,shared_llm
-from utils import Prompts, Formats, translate_selected_fields
+import orjson
+from cachetools import TTLCache
+from ia import get_assistant
+from utils import DEFAULT_PROMPTS, Formats, translate_selected_fields, now_ts
 from models import StoryRequestBody
 
 
 # Instancia del asistente para historias de usuario
-UserStoriesAI = Assistant(
-    subdirectory='stories_pdfs',
-    conversation_manager=shared_conversation_manager,
-    llm=shared_llm
-    )
+UserStoriesAI = get_assistant('stories_pdfs')
 
-UserStoryPrompt = Prompts()
+UserStoryPrompt = DEFAULT_PROMPTS
 USprompt = UserStoryPrompt.getUSprompt()
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 
 JSONOutputFormater = Formats()
 
-@router.post("/generate-user-stories")
-async def generate_user_stories(body: StoryRequestBody):
-    try:
-        epics_data = body.epic_description
+# Máximo de llamadas simultáneas al LLM por solicitud (límites de cuota del proveedor)
+STORY_CONCURRENCY = int(os.environ.get("STORY_CONCURRENCY", 5))
+
+# Respuestas finales ya serializadas (inmutables) por hash del cuerpo de la solicitud (épicas, sesión e idioma)
+# y de la huella del historial de la sesión, que también forma parte del prompt
+STORY_CACHE_TTL = int(os.environ.get("STORY_CACHE_TTL", 3600))
+_story_cache = TTLCache(maxsize=1024, ttl=STORY_CACHE_TTL)
+
+
+def _story_cache_key(body: StoryRequestBody) -> str:
+    payload = orjson.dumps(body.model_dump(), option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    # Un turno nuevo en /chat o un historial borrado cambian la huella y, con ella, la clave
+    fingerprint = repr(UserStoriesAI.conversation_manager._history_fingerprint(body.session_id)).encode("utf-8")
+    return hashlib.blake2b(payload + b"\x00" + fingerprint, digest_size=16).hexdigest()
 
-        epics = epics_data["content"]
 
-        epic_groups = JSONOutputFormater.split_content(epics)
-        all_user_stories = []
+async def _build_user_stories(body: StoryRequestBody, timestamp: str) -> dict:
+    """
+    Genera, numera y traduce las historias de usuario de todas las épicas de la solicitud.
 
-        for group in epic_groups:
-            input_text = JSONOutputFormater.format_epic_group_input(group)
+    Generates, numbers and translates the user stories for every epic in the request.
+    """
+    epics = body.epic_description["content"]
 
-            partial_user_stories = await UserStoriesAI.generate_content(
-                query=input_text,
-                preprompt=UserStoryPrompt,
+    epic_groups = JSONOutputFormater.split_content(epics)
+    all_user_stories = []
+
+    semaphore = asyncio.Semaphore(STORY_CONCURRENCY)
+
+    async def generate_group(group):
+        async with semaphore:
+            return await UserStoriesAI.generate_content(
+                query=JSONOutputFormater.format_epic_group_input(group),
+                preprompt=USprompt,
                 session_id=body.session_id,
                 type="historias_usuario",
                 newchat=False
             )
 
-            parsed = json.loads(partial_user_stories)
-            if isinstance(parsed.get("content"), list):
-                all_user_stories.extend(parsed["content"])
-
-        response = JSONOutputFormater.fix_content_ids(all_user_stories,"US")
-
-        final_response = {
-            "status": "HISTORIAS_GENERADAS",
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "content": response,
-            "missing_info": None,
-            "metadata": None
-        }
-        
-        lang = body.lang
-        if lang:
-            final_response = translate_selected_fields(final_response, target_lang=lang)
-
-        final_response_text = json.dumps(final_response, indent=4, ensure_ascii=False)
-        
-        UserStoriesAI.conversation_manager.load_conversation_histories()
-        
-        UserStoriesAI.conversation_manager.conversations[body.session_id]["history"].append(
+    # gather conserva el orden de los grupos
+    partial_results = await asyncio.gather(*(generate_group(group) for group in epic_groups))
+
+    for partial_user_stories in partial_results:
+        parsed = orjson.loads(partial_user_stories)
+        if isinstance(parsed.get("content"), list):
+            all_user_stories.extend(parsed["content"])
+
+    response = JSONOutputFormater.fix_content_ids(all_user_stories,"US")
+
+    final_response = {
+        "status": "HISTORIAS_GENERADAS",
+        "timestamp": timestamp,
+        "content": response,
+        "missing_info": None,
+        "metadata": None
+    }
+
+    lang = body.lang
+    if lang:
+        # La traducción hace llamadas de red bloqueantes: se ejecuta fuera del event loop
+        final_response = await asyncio.to_thread(translate_selected_fields, final_response, target_lang=lang, inplace=True)
+
+    return final_response
+
+
+@router.post("/generate-user-stories")
+async def generate_user_stories(body: StoryRequestBody):
+    try:
+        epics_data = body.epic_description
+
+        # Una solicitud idéntica reutiliza la respuesta sin volver a llamar al LLM.
+        # Ya quedó en el historial de la sesión la primera vez, así que no se registra de nuevo.
+        cache_key = _story_cache_key(body)
+        cached = _story_cache.get(cache_key)
+
+        if cached is not None:
+            return Response(content=cached, media_type="application/json", status_code=200)
+
+        # Un solo timestamp para la respuesta y su entrada de historial
+        timestamp = now_ts()
+        final_response = await _build_user_stories(body, timestamp)
+        final_response_bytes = orjson.dumps(final_response)
+
+        await UserStoriesAI.conversation_manager.record_interaction(
+            body.session_id,
             {
                 "query": str(epics_data),
-                "response":final_response_text,
-                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "response":final_response_bytes.decode(),
+                "timestamp": timestamp,
                 "raw_response": final_response
             }
         )
 
-        UserStoriesAI.conversation_manager.auto_save_history(body.session_id)
-
+        # Se guarda con la huella que deja este turno: repetir la solicitud sin otros cambios acierta
+        _story_cache[_story_cache_key(body)] = final_response_bytes
 
-        return JSONResponse(content=final_response, status_code=200)
+        return Response(content=final_response_bytes, media_type="application/json", status_code=200)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,3 +1,4 @@
-from .prompts import Prompts
+from .prompts import Prompts, DEFAULT_PROMPTS
 from .format import Formats
-from .translator import translate_selected_fields
\ No newline at end of file
+from .translator import translate_selected_fields, translate_batch
+from .timestamps import now_ts
\ No newline at end of file
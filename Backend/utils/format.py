@@ -1,47 +1,54 @@
-import json
-from datetime import datetime
-from typing import List, Dict
+import orjson
+from typing import List, Dict, Optional
+from itertools import chain
 
+from .timestamps import now_ts
+
+NF_PREFIX = "REQ-NF-"
 
-class Formats:
 
-    def __init__(self):
-        pass
+class Formats:
+    # Sin estado: los métodos son estáticos y se pueden llamar desde la clase o una instancia
 
-    def merge_responses(self,f_response: str, nf_response: str) -> dict:
+    @staticmethod
+    def merge_responses(f_response: str, nf_response: str, timestamp: Optional[str] = None) -> dict:
         """
         Une dos respuestas del modelo (funcional y no funcional) en un solo JSON estandarizado.
+        Usa el timestamp de la solicitud si se recibe.
 
         Merges two LLM responses (functional and non-functional) into a unified standardized JSON.
+        Uses the request's timestamp when one is given.
         """
         try:
-            f_dict = json.loads(f_response)
-        except json.JSONDecodeError:
+            f_dict = orjson.loads(f_response)
+        except orjson.JSONDecodeError:
             f_dict = {}
 
         try:
-            nf_dict = json.loads(nf_response)
-        except json.JSONDecodeError:
+            nf_dict = orjson.loads(nf_response)
+        except orjson.JSONDecodeError:
             nf_dict = {}
 
         f_items = f_dict.get("content", []) if isinstance(f_dict.get("content"), list) else []
         nf_items = nf_dict.get("content", []) if isinstance(nf_dict.get("content"), list) else []
 
         seen_ids = set()
+        seen_ids_add = seen_ids.add
 
         funcionales = []
         no_funcionales = []
 
-        for item in f_items + nf_items:
-            if not isinstance(item, dict):
+        for item in chain(f_items, nf_items):
+            if type(item) is not dict:
                 continue
             item_id = item.get("id")
 
             if not item_id or item_id in seen_ids:
                 continue
-            seen_ids.add(item_id)
+            seen_ids_add(item_id)
 
-            if str(item_id).startswith("REQ-NF-"):
+            sid = item_id if type(item_id) is str else str(item_id)
+            if sid.startswith(NF_PREFIX):
                 item["category"] = "No Funcional"
                 no_funcionales.append(item)
             
@@ -52,7 +59,7 @@ class Formats:
         combined = {
             "status": "REQUERIMIENTOS_GENERADOS",
             "query": f_dict.get("query", "") or nf_dict.get("query", ""),
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "timestamp": timestamp or now_ts(),
             "content": {
                 "funcionales": funcionales,
                 "no_funcionales": no_funcionales
@@ -64,40 +71,36 @@ class Formats:
         return combined
     
 
-    def split_content(self,content: List[Dict], chunk_size: int = 5) -> List[List[Dict]]:
+    @staticmethod
+    def split_content(content: List[Dict], chunk_size: int = 5) -> List[List[Dict]]:
         """
         Divide el contenido en fragmentos más pequeños.
         Split content into smaller chunks to improve prompt performance.
         """
         return [content[i:i + chunk_size] for i in range(0, len(content), chunk_size)]
 
-    def fix_content_ids(self,content: List[Dict], type: str) -> List[Dict]:
+    @staticmethod
+    def fix_content_ids(content: List[Dict], type: str) -> List[Dict]:
         """
         Reasigna los IDs de las Historias de Usuario al formato US-### de forma secuencial.
         Reasigna los IDs de las Epicas al formato EPIC-### de forma secuencial.
         """
 
-        fixed = []
+        prefix = "EPIC-" if type == "epic" else "US-"
 
-        for i, gen_cont in enumerate(content, 1):
-            new_cont = gen_cont.copy()
-            if type == "epic": new_cont["id"] = f"EPIC-{i:03d}"
-            else: new_cont["id"] = f"US-{i:03d}"
-            fixed.append(new_cont)
-        
-        return fixed
+        return [{**gen_cont, "id": f"{prefix}{i:03d}"} for i, gen_cont in enumerate(content, 1)]
 
-    def format_requirements_for_prompt(self,requirements: List[Dict]) -> str:
-        formatted = ""
-        for req in requirements:
-            formatted += f"- ({req.get('id')}) {req.get('title')}: {req.get('description')}\n"
-        return formatted
+    @staticmethod
+    def format_requirements_for_prompt(requirements: List[Dict]) -> str:
+        return "".join(f"- ({req.get('id')}) {req.get('title')}: {req.get('description')}\n" for req in requirements)
 
-    def format_epic_group_input(self,epic_group: list) -> str:
-        prompt_input = ""
+    @staticmethod
+    def format_epic_group_input(epic_group: list) -> str:
+        parts = []
+        append = parts.append
         for epic in epic_group:
-            prompt_input += f"EPIC: {epic['title']} ({epic['id']})\nDescripción: {epic['description']}\nRequerimientos:\n"
+            append(f"EPIC: {epic['title']} ({epic['id']})\nDescripción: {epic['description']}\nRequerimientos:\n")
             for req in epic.get("related_requirements", []):
-                prompt_input += f"- {req['id']}: {req['description']}\n"
-            prompt_input += "\n"
-        return prompt_input
+                append(f"- {req['id']}: {req['description']}\n")
+            append("\n")
+        return "".join(parts)
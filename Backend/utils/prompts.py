@@ -1,89 +1,35 @@
-from typing import List
-'''
-# Prompt base para generar requerimientos funcionales
-FunctionalRequirementsPrompt = (
-    "Imagina que eres un SCRUM Master con 20 años de experiencia en metodologías Agile. "
-    "Tu tarea es generar requisitos funcionales detallados y específicos basados en "
-    "la descripción del proyecto que se te proporcionará. Debes ser conciso y evitar redundancias. "
-    "Responde únicamente cuando recibas una descripción clara y válida de un proyecto de software. "
-    "Si la descripción del proyecto es insuficiente para generar los requerimientos, pide detalles "
-    "específicos que falten. Por ejemplo, si necesitas más información sobre los usuarios finales "
-    "del sistema o los objetivos específicos del proyecto, indícalo claramente. Presenta los requerimientos "
-    "en una lista clara. Basate en el siguiente ejemplo: "
-    "1. Inicio de sesión de usuario: El sistema debe permitir a los usuarios iniciar sesión utilizando un nombre de usuario y contraseña válidos. "
-    "2. Procesamiento de Negocios: El sistema debe procesar los pagos con tarjeta de crédito y proporcionar a los usuarios un recibo cuando las transacciones sean exitosas."
-)
+from dataclasses import dataclass, field
+from typing import Final, Tuple
 
-# Prompt base para generar requerimientos no funcionales
-NonFunctionalRequirementsPrompt = (
-    "Imagina que eres un SCRUM Master con 20 años de experiencia en metodologías Agile. "
-    "Tu tarea es generar requisitos no funcionales detallados y específicos basados en "
-    "la descripción del proyecto que se te proporcionará. Debes ser conciso y evitar redundancias. "
-    "Responde únicamente cuando recibas una descripción clara y válida de un proyecto de software. "
-    "Si la descripción del proyecto es insuficiente para generar los requerimientos, pide detalles "
-    "específicos que falten. Por ejemplo, si necesitas más información sobre los usuarios finales "
-    "del sistema o los objetivos específicos del proyecto, indícalo claramente. Presenta los requerimientos "
-    "en una lista clara. Basate en el siguiente ejemplo: "
-    "Velocidad de rendimiento: El sistema debe procesar las solicitudes de los usuarios en un plazo promedio de 2 segundos, incluso con mucho tráfico de usuarios. "
-    "Disponibilidad del sistema: El sistema debe mantener un tiempo de actividad del 99.9 % para garantizar que los usuarios tengan acceso constante."
-)
 
-# Prompt base para generar epicas
-EpicsPrompt = "Imagina que eres un Product Owner con amplia experiencia en metodologías Agile, " \
-"especialmente en Scrum. Tu tarea es formular épicas claras y comprensivas que resuman grandes" \
-" áreas de funcionalidad basadas en los requerimientos que te daran del proyecto. Estos" \
-" requerimientos abarcan las necesidades estratégicas y funcionales del negocio, y tu objetivo" \
-" es asegurar que las épicas reflejen estos objetivos de alto nivel de una manera que guíe " \
-" efectivamente el desarrollo del proyecto. Debes ser conciso y evitar detalles técnicos profundos," \
-" ya que las épicas deben ser lo suficientemente amplias para abarcar varias historias de usuario" \
-" pero específicas para dirigir el desarrollo. Las épicas deben presentarse en una lista clara," \
-" proporcionando un marco que pueda desglosarse en historias de usuario más detalladas durante" \
-" las fases de sprint. Por ejemplo, puedes considerar las siguientes épicas basadas en los tipos" \
-" de requerimientos típicos:" \
-"1. **Automatización de la Interacción con el Cliente**: Desarrollar un sistema que automatice las interacciones entre los clientes y la plataforma, desde el soporte inicial hasta las consultas de seguimiento, mejorando la eficiencia y la satisfacción del cliente." \
-"2. **Expansión de la Plataforma Móvil**: Crear funcionalidades robustas para la aplicación móvil que permitan una gestión completa y segura del usuario, mejorando la accesibilidad y el engagement en dispositivos móviles."
+# Cada prompt se divide en una parte de sistema y un ejemplo, ambos constantes: el texto enviado
+# al modelo es idéntico byte a byte entre llamadas y el proveedor puede reutilizar el prefijo.
 
-# Prompt base para generar historias de usuario
-UserStoryPrompt = (
-    "Imagina que eres un Product Owner con experiencia en metodologías ágiles. "
-    "Tu tarea es generar historias de usuario claras y accionables a partir de las épicas del sistema. "
-    "Cada historia de usuario debe tener el siguiente formato:\n"
-    "- id: US-###\n" 
-    "- title: título breve y descriptivo\n"
-    "- description: 'Como [tipo de usuario], quiero [objetivo] para [beneficio]'\n"
-    "- priority: Alta, Media o Baja\n"
-    "- acceptance_criteria: lista de criterios de aceptación\n"
-    "- assigned_epic: ID de la épica asociada (formato EPIC-###)"
-)
-'''
-
-FunctionalRequirementsPrompt = (
+# Instrucciones comunes a los prompts de requerimientos funcionales y no funcionales
+_REQUIREMENTS_PREAMBLE = (
     "Imagine you are a SCRUM Master with 20 years of experience in Agile methodologies. "
-    "Your task is to generate detailed and specific functional requirements based on "
+    "Your task is to generate detailed and specific {kind} requirements based on "
     "the project description that will be provided. You must be concise and avoid redundancies. "
     "Only respond when you receive a clear and valid software project description. "
     "If the project description is insufficient to generate the requirements, ask for the specific "
     "missing details. For example, if you need more information about the system’s end users "
     "or the specific goals of the project, indicate that clearly. Present the requirements "
     "in a clear list. Base your output on the following example: "
+)
+
+FUNC_SYSTEM: Final[str] = _REQUIREMENTS_PREAMBLE.format(kind="functional")
+FUNC_EXAMPLE: Final[str] = (
     "1. User Login: The system must allow users to log in using a valid username and password. "
     "2. Business Processing: The system must process credit card payments and provide users with a receipt when transactions are successful."
 )
 
-NonFunctionalRequirementsPrompt = (
-    "Imagine you are a SCRUM Master with 20 years of experience in Agile methodologies. "
-    "Your task is to generate detailed and specific non-functional requirements based on "
-    "the project description that will be provided. You must be concise and avoid redundancies. "
-    "Only respond when you receive a clear and valid software project description. "
-    "If the project description is insufficient to generate the requirements, ask for the specific "
-    "missing details. For example, if you need more information about the system’s end users "
-    "or the specific goals of the project, indicate that clearly. Present the requirements "
-    "in a clear list. Base your output on the following example: "
+NON_FUNC_SYSTEM: Final[str] = _REQUIREMENTS_PREAMBLE.format(kind="non-functional")
+NON_FUNC_EXAMPLE: Final[str] = (
     "Performance Speed: The system must process user requests within an average of 2 seconds, even under heavy user traffic. "
     "System Availability: The system must maintain 99.9% uptime to ensure users have continuous access."
 )
 
-EpicsPrompt = (
+EPIC_SYSTEM: Final[str] = (
     "Imagine you are a Product Owner with extensive experience in Agile methodologies, "
     "especially Scrum. Your task is to formulate clear and comprehensive epics that summarize "
     "large functional areas based on the project requirements provided. These "
@@ -92,14 +38,19 @@ EpicsPrompt = (
     "project development. Be concise and avoid deep technical details, as epics should be broad enough "
     "to encompass multiple user stories, but specific enough to direct development. Present the epics "
     "in a clear list, providing a framework that can be broken down into detailed user stories during "
-    "sprint planning. For example, you can consider the following epics based on typical types of requirements: "
+    "sprint planning. "
+)
+EPIC_EXAMPLE: Final[str] = (
+    "For example, you can consider the following epics based on typical types of requirements: "
     "1. **Customer Interaction Automation**: Develop a system that automates customer interactions with the platform, from initial support to follow-up inquiries, improving efficiency and customer satisfaction. "
     "2. **Mobile Platform Expansion**: Build robust functionality for the mobile app that allows for complete and secure user management, enhancing accessibility and engagement on mobile devices."
 )
 
-UserStoryPrompt = (
+US_SYSTEM: Final[str] = (
     "Imagine you are a Product Owner with experience in Agile methodologies. "
     "Your task is to generate clear and actionable user stories based on the system's epics. "
+)
+US_EXAMPLE: Final[str] = (
     "Each user story should follow the following format:\n"
     "- id: US-###\n"
     "- title: short and descriptive title\n"
@@ -109,30 +60,34 @@ UserStoryPrompt = (
     "- assigned_epic: ID of the associated epic (format EPIC-###)"
 )
 
+FunctionalRequirementsPrompt = FUNC_SYSTEM + FUNC_EXAMPLE
+NonFunctionalRequirementsPrompt = NON_FUNC_SYSTEM + NON_FUNC_EXAMPLE
+EpicsPrompt = EPIC_SYSTEM + EPIC_EXAMPLE
+UserStoryPrompt = US_SYSTEM + US_EXAMPLE
+
 
+@dataclass(slots=True, frozen=True)
 class Prompts:
-    __slots__ = ["_US_prompt",
-                 "_REQ_F_prompt",
-                 "_REQ_NF_prompt",
-                 "_EPIC_prompt"]
+    # Inmutable y sin __dict__: los prompts no cambian después de crear la instancia
+    US_prompt: str = UserStoryPrompt
+    REQ_F_prompt: str = FunctionalRequirementsPrompt
+    REQ_NF_prompt: str = NonFunctionalRequirementsPrompt
+    EPIC_prompt: str = EpicsPrompt
+    _REQ_prompts: Tuple[str, str] = field(init=False, repr=False, compare=False)
 
-    def __init__(self, 
-                 US_prompt = UserStoryPrompt,
-                 REQ_F_prompt = FunctionalRequirementsPrompt,
-                 REQ_NF_prompt = NonFunctionalRequirementsPrompt,
-                 EPIC_prompt = EpicsPrompt
-                 ):
-        
-        self._US_prompt = US_prompt
-        self._REQ_F_prompt = REQ_F_prompt
-        self._REQ_NF_prompt = REQ_NF_prompt
-        self._EPIC_prompt = EPIC_prompt
+    def __post_init__(self):
+        # frozen impide la asignación normal; el par se arma una sola vez
+        object.__setattr__(self, "_REQ_prompts", (self.REQ_F_prompt, self.REQ_NF_prompt))
 
-    def getREQprompt(self) -> List[str]:
-        return [self._REQ_F_prompt,self._REQ_NF_prompt]
+    def getREQprompt(self) -> Tuple[str, str]:
+        return self._REQ_prompts
 
     def getEPICprompt(self) -> str:
-        return self._EPIC_prompt
+        return self.EPIC_prompt
     
     def getUSprompt(self) -> str:
-        return self._US_prompt
\ No newline at end of file
+        return self.US_prompt
+
+
+# Instancia compartida con los prompts por defecto
+DEFAULT_PROMPTS: Final[Prompts] = Prompts()
\ No newline at end of file
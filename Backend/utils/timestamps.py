@@ -0,0 +1,27 @@
+import time
+from datetime import datetime
+
+
+# (segundo, texto) del último timestamp formateado / (second, text) of the last formatted timestamp
+_ts_cache = (0, "")
+
+
+def now_ts() -> str:
+    """
+    Retorna la fecha y hora actual como "YYYY-MM-DD HH:MM:SS", formateándola a lo sumo una vez por segundo.
+
+    Returns the current date and time as "YYYY-MM-DD HH:MM:SS", formatting it at most once per second.
+    """
+    global _ts_cache
+
+    now = int(time.time())
+    cached_second, cached_text = _ts_cache
+
+    if cached_second != now:
+        dt = datetime.fromtimestamp(now)
+        cached_text = f"{dt.year:04d}-{dt.month:02d}-{dt.day:02d} {dt.hour:02d}:{dt.minute:02d}:{dt.second:02d}"
+        # Se reasigna la tupla completa para que otros hilos nunca vean un par a medias
+        # The whole tuple is rebound so other threads never observe a half-updated pair
+        _ts_cache = (now, cached_text)
+
+    return cached_text
\ No newline at end of file
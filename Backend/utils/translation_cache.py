@@ -0,0 +1,93 @@
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+
+# Ubicación, vigencia y tamaño máximo de la cache persistente de traducciones
+# Location, lifetime and maximum size of the persistent translation cache
+TRANSLATION_CACHE_PATH = os.environ.get(
+    "TRANSLATION_CACHE_PATH",
+    os.path.join(tempfile.gettempdir(), "raices_translations.sqlite3")
+)
+TRANSLATION_CACHE_TTL = 30 * 24 * 3600
+TRANSLATION_CACHE_MAX_ROWS = 200_000
+
+
+def _cache_key(text: str, target_lang: str) -> str:
+    return f"{target_lang}:{hashlib.sha1(text.encode('utf-8')).hexdigest()}"
+
+
+class TranslationCache:
+    """
+    Cache de traducciones en SQLite que sobrevive a reinicios del proceso.
+    Las claves son (idioma destino, sha1 del texto); las entradas vencen tras TRANSLATION_CACHE_TTL.
+
+    SQLite-backed translation cache that survives process restarts.
+    Keys are (target language, sha1 of the text); entries expire after TRANSLATION_CACHE_TTL.
+    """
+
+    __slots__ = ["_connection", "_lock", "_writes"]
+
+    def __init__(self, path: str = TRANSLATION_CACHE_PATH):
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            "key TEXT PRIMARY KEY, translated TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._connection.commit()
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def get_many(self, texts, target_lang: str) -> dict:
+        """
+        Devuelve {texto: traducción} para los textos con una entrada vigente.
+
+        Returns {text: translation} for the texts that have a live entry.
+        """
+        keys = {_cache_key(text, target_lang): text for text in texts}
+        if not keys:
+            return {}
+
+        found = {}
+        oldest = time.time() - TRANSLATION_CACHE_TTL
+        key_list = list(keys)
+        with self._lock:
+            # SQLite limita los parámetros por consulta
+            for start in range(0, len(key_list), 500):
+                chunk = key_list[start:start + 500]
+                rows = self._connection.execute(
+                    f"SELECT key, translated FROM translations WHERE created_at >= ? AND key IN ({','.join('?' * len(chunk))})",
+                    (oldest, *chunk)
+                ).fetchall()
+                for key, translated in rows:
+                    found[keys[key]] = translated
+        return found
+
+    def set_many(self, translations: dict, target_lang: str):
+        """
+        Guarda {texto: traducción} y recorta las entradas más antiguas si se supera el máximo.
+
+        Stores {text: translation} and trims the oldest entries when the maximum is exceeded.
+        """
+        if not translations:
+            return
+
+        now = time.time()
+        rows = [(_cache_key(text, target_lang), translated, now) for text, translated in translations.items()]
+        with self._lock:
+            self._connection.executemany("INSERT OR REPLACE INTO translations VALUES (?, ?, ?)", rows)
+            self._writes += len(rows)
+
+            # El recorte se hace cada tantas escrituras, no en cada una
+            if self._writes >= 1000:
+                self._writes = 0
+                self._connection.execute(
+                    "DELETE FROM translations WHERE created_at < ? OR key IN ("
+                    "SELECT key FROM translations ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (now - TRANSLATION_CACHE_TTL, TRANSLATION_CACHE_MAX_ROWS)
+                )
+            self._connection.commit()
\ No newline at end of file
@@ -1,36 +1,328 @@
+import re
+import sys
+import threading
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List
+
+from cachetools import LRUCache
 from deep_translator import GoogleTranslator
 from langdetect import detect
 
-TRANSLATABLE_FIELDS = {"title", "description", "acceptance_criteria"}
+from .translation_cache import TranslationCache
+
+# re2 (google-re2) garantiza tiempo lineal sobre texto arbitrario; es opcional
+# re2 (google-re2) guarantees linear time over arbitrary text; it is optional
+try:
+    import re2 as _stopword_re
+except ImportError:
+    _stopword_re = re
+
+TRANSLATABLE_FIELDS = frozenset(map(sys.intern, ("title", "description", "acceptance_criteria")))
+
+# Separador para empaquetar varios textos en una sola llamada al traductor
+# Separator used to pack several texts into a single translator call
+BATCH_SEPARATOR = "\n\x1e\n"
+BATCH_CHAR_LIMIT = 4500
+
+# Resultados cortos (prioridades, criterios repetidos) se internan
+# Short results (priorities, repeated criteria) are interned
+INTERN_MAX_LENGTH = 80
+
+# Traducciones ya resueltas por (texto, idioma); se repiten entre sesiones
+# Already resolved translations by (text, language); they repeat across sessions
+_translation_cache = LRUCache(maxsize=10_000)
+
+# LRUCache no es seguro entre hilos y get también reordena: todo acceso pasa por este candado
+# LRUCache is not thread-safe and get also reorders it: every access goes through this lock
+_translation_cache_lock = threading.Lock()
+
+# Respaldo en disco de la cache anterior; se abre en el primer uso
+# Disk-backed fallback for the cache above; opened on first use
+_disk_cache = None
+_disk_cache_lock = threading.Lock()
+
+# Llamadas de traducción simultáneas (limitadas por red, no por CPU)
+# Concurrent translation calls (network-bound, not CPU-bound)
+TRANSLATION_WORKERS = 8
+
+# Un solo pool por proceso: sus hilos (y los traductores por hilo) viven entre llamadas
+# A single pool per process: its threads (and the per-thread translators) live across calls
+_translation_executor = ThreadPoolExecutor(max_workers=TRANSLATION_WORKERS, thread_name_prefix="translator")
+
+# GoogleTranslator guarda el texto en curso en la instancia: una por hilo y por idioma
+# GoogleTranslator keeps the text in flight on the instance: one per thread and language
+_thread_local = threading.local()
+
+def _get_translator(target_lang: str) -> GoogleTranslator:
+    translators = getattr(_thread_local, "translators", None)
+    if translators is None:
+        translators = _thread_local.translators = {}
+
+    translator = translators.get(target_lang)
+    if translator is None:
+        translator = translators[target_lang] = GoogleTranslator(source='auto', target=target_lang)
+    return translator
+
+def _cache_get(key):
+    with _translation_cache_lock:
+        return _translation_cache.get(key)
+
+def _cache_set(key, value):
+    with _translation_cache_lock:
+        _translation_cache[key] = value
+
+def _get_disk_cache():
+    global _disk_cache
+    if _disk_cache is None:
+        with _disk_cache_lock:
+            if _disk_cache is None:
+                try:
+                    _disk_cache = TranslationCache()
+                except Exception as e:
+                    # Sin disco (solo lectura, ruta inválida) se sigue solo con la cache en memoria
+                    # Without a usable disk (read-only, bad path) only the in-memory cache is used
+                    print(f"Cache de traducciones en disco deshabilitada: {e}")
+                    _disk_cache = False
+    return _disk_cache or None
+
+def _map_concurrently(function, items):
+    # Ejecuta en hilos solo cuando hay más de una llamada
+    # Only uses threads when there is more than one call
+    if len(items) < 2:
+        return [function(item) for item in items]
+    return list(_translation_executor.map(function, items))
+
+# Texto ASCII imprimible y palabras frecuentes del español (que delatan texto sin acentos)
+# Printable ASCII text and common Spanish words (which give away unaccented text)
+_ASCII_RE = re.compile(r'^[\x20-\x7E]+$')
+# (?i) en el patrón: re2 no acepta las banderas de `re`
+_SPANISH_MARKERS_RE = _stopword_re.compile(
+    r'(?i)\b(?:que|para|el|la|los|las|del|de|con|por|una|un|en|se|debe|como|y)\b'
+)
+_ENGLISH_MARKERS_RE = _stopword_re.compile(
+    r'(?i)\b(?:the|and|for|with|of|to|is|a|an|that|must|should|as|in)\b'
+)
+
+def _detect_heuristic(text: str):
+    # Cuenta palabras vacías de cada idioma; solo decide si la ventaja es clara
+    # Counts stopwords of each language; only decides when the lead is clear
+    spanish = len(_SPANISH_MARKERS_RE.findall(text))
+    english = len(_ENGLISH_MARKERS_RE.findall(text))
+    if spanish >= 2 and spanish >= 2 * english:
+        return 'es'
+    if english >= 2 and english >= 2 * spanish:
+        return 'en'
+    return None
+
+@lru_cache(maxsize=4096)
+def _detect_cached(text: str) -> str:
+    # langdetect solo se usa cuando la heurística no alcanza
+    # langdetect is only used when the heuristic is not enough
+    return _detect_heuristic(text) or detect(text)
 
 def should_translate(text: str, target_lang: str) -> bool:
+    # Textos muy cortos o sin letras (IDs, números) no se traducen ni se detectan
+    if len(text) < 3 or not any(ch.isalpha() for ch in text):
+        return False
+    # ASCII sin marcadores del español se asume inglés (IDs, prioridades, texto ya traducido)
+    if target_lang == 'en' and _ASCII_RE.match(text) and not _SPANISH_MARKERS_RE.search(text):
+        return False
     try:
-        detected = detect(text)
+        detected = _detect_cached(text)
         return detected != target_lang
     except:
         return False
 
 def translate_text(text: str, target_lang: str) -> str:
+    key = (text, target_lang)
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+
+    translated = text
     if should_translate(text, target_lang):
-        return GoogleTranslator(source='auto', target=target_lang).translate(text)
-    return text
-
-def translate_selected_fields(data, target_lang="en"):
-    if isinstance(data, dict):
-        translated_data = {}
-        for key, value in data.items():
-            if key in TRANSLATABLE_FIELDS:
-                if isinstance(value, str):
-                    translated_data[key] = translate_text(value, target_lang)
-                elif isinstance(value, list):
-                    translated_data[key] = [translate_text(v, target_lang) if isinstance(v, str) else translate_selected_fields(v, target_lang) for v in value]
-                else:
-                    translated_data[key] = value
+        disk_cache = _get_disk_cache()
+        stored = disk_cache.get_many((text,), target_lang) if disk_cache else {}
+        translated = stored.get(text)
+        if translated is None:
+            translated = _get_translator(target_lang).translate(text)
+            if disk_cache and translated:
+                disk_cache.set_many({text: translated}, target_lang)
+    _cache_set(key, translated)
+    return translated
+
+def _pack_batches(indexes, texts):
+    # Agrupa los índices para que cada paquete quepa en una sola llamada
+    # Groups indexes so each pack fits in a single call
+    batch, size = [], 0
+    for i in indexes:
+        length = len(texts[i]) + len(BATCH_SEPARATOR)
+        if batch and size + length > BATCH_CHAR_LIMIT:
+            yield batch
+            batch, size = [], 0
+        batch.append(i)
+        size += length
+    if batch:
+        yield batch
+
+def translate_batch(texts: List[str], target_lang: str) -> List[str]:
+    # Los textos repetidos (p. ej. criterios de aceptación comunes) se traducen una sola vez
+    # Repeated texts (e.g. shared acceptance criteria) are translated only once
+    # y cada aparición recibe el mismo objeto str
+    # and every occurrence gets the same str object
+    unique = list(dict.fromkeys(texts))
+    translated = {
+        text: sys.intern(result) if len(result) <= INTERN_MAX_LENGTH else result
+        for text, result in zip(unique, _translate_unique(unique, target_lang))
+    }
+    return [translated[text] for text in texts]
+
+def _translate_unique(texts, target_lang):
+    results = list(texts)
+    pending = []
+    for i, text in enumerate(texts):
+        cached = _cache_get((text, target_lang))
+        if cached is not None:
+            results[i] = cached
+        elif should_translate(text, target_lang):
+            pending.append(i)
+        else:
+            _cache_set((text, target_lang), text)
+    if not pending:
+        return results
+
+    # Lo que no está en memoria puede estar en disco desde un proceso anterior
+    # What is not in memory may be on disk from a previous process
+    disk_cache = _get_disk_cache()
+    if disk_cache:
+        stored = disk_cache.get_many([texts[i] for i in pending], target_lang)
+        remaining = []
+        for i in pending:
+            part = stored.get(texts[i])
+            if part is None:
+                remaining.append(i)
             else:
-                translated_data[key] = translate_selected_fields(value, target_lang)
-        return translated_data
+                results[i] = part
+                _cache_set((texts[i], target_lang), part)
+        pending = remaining
+        if not pending:
+            return results
+
+    new_translations = {}
+
+    def translate_pack(batch):
+        try:
+            translated = _get_translator(target_lang).translate(BATCH_SEPARATOR.join(texts[i] for i in batch)) or ""
+        except Exception:
+            return None
+        parts = [part.strip() for part in translated.split("\x1e")]
+        return parts if len(parts) == len(batch) else None
+
+    def translate_one(i):
+        try:
+            return _get_translator(target_lang).translate(texts[i]) or texts[i]
+        except Exception:
+            # Límite de peticiones o error del proveedor: se conserva el original
+            # Rate limit or provider error: keep the original
+            return texts[i]
+
+    batches = list(_pack_batches(pending, texts))
+    unresolved = []
+    for batch, parts in zip(batches, _map_concurrently(translate_pack, batches)):
+        # Si el traductor alteró el separador, ese paquete se traduce texto por texto
+        # If the translator mangled the separator, that pack is translated one text at a time
+        if parts is None:
+            unresolved.extend(batch)
+            continue
+        for i, part in zip(batch, parts):
+            results[i] = part
+            _cache_set((texts[i], target_lang), part)
+            new_translations[texts[i]] = part
+
+    for i, part in zip(unresolved, _map_concurrently(translate_one, unresolved)):
+        results[i] = part
+        if part is not texts[i]:
+            _cache_set((texts[i], target_lang), part)
+            new_translations[texts[i]] = part
+
+    if disk_cache:
+        disk_cache.set_many(new_translations, target_lang)
+    return results
+
+def _collect_translatable(data, slots, inplace=False):
+    # Copia la estructura (salvo inplace) y registra (contenedor, clave) de cada texto a traducir.
+    # Recorrido iterativo con pila explícita: sin recursión ni límite de profundidad.
+    # Copies the structure (unless inplace) and records (container, key) for each text to translate.
+    # Iterative traversal with an explicit stack: no recursion and no depth limit.
+    root = [data]
+    stack = [(root, 0)]
+    while stack:
+        container, key = stack.pop()
+        value = container[key]
+
+        if isinstance(value, dict):
+            copied = value if inplace else dict(value)
+            container[key] = copied
+            for field, field_value in copied.items():
+                if field not in TRANSLATABLE_FIELDS:
+                    stack.append((copied, field))
+                elif isinstance(field_value, str):
+                    slots.append((copied, field))
+                elif isinstance(field_value, list):
+                    items = field_value if inplace else list(field_value)
+                    copied[field] = items
+                    for i, item in enumerate(items):
+                        if isinstance(item, str):
+                            slots.append((items, i))
+                        else:
+                            stack.append((items, i))
+
+        elif isinstance(value, list):
+            copied = value if inplace else list(value)
+            container[key] = copied
+            stack.extend((copied, i) for i in range(len(copied)))
+
+    return root[0]
+
+# Textos y caracteres que se muestrean para decidir si el documento ya está en el idioma destino
+# Texts and characters sampled to decide whether the document is already in the target language
+SAMPLE_TEXTS = 5
+SAMPLE_CHAR_LIMIT = 500
+
+def _first_texts(data):
+    # Recorre la estructura en orden y entrega los textos de los campos traducibles
+    # Walks the structure in order and yields the texts of the translatable fields
+    stack = [(data, False)]
+    while stack:
+        value, translatable = stack.pop()
+        if isinstance(value, str):
+            if translatable:
+                yield value
+        elif isinstance(value, dict):
+            stack.extend((field_value, field in TRANSLATABLE_FIELDS) for field, field_value in reversed(value.items()))
+        elif isinstance(value, list):
+            stack.extend((item, translatable) for item in reversed(value))
+
+def translate_selected_fields(data, target_lang="en", inplace=False):
+    # inplace=True traduce sobre `data` sin copiarlo; para quien descarta el original
+    # inplace=True translates `data` without copying it; for callers that discard the original
+
+    # Si una muestra de los primeros textos ya está en el idioma destino no se traduce nada;
+    # sin inplace se sigue devolviendo una copia, como en el camino normal
+    # If a sample of the first texts is already in the target language nothing is translated;
+    # without inplace a copy is still returned, as in the normal path
+    sample = " ".join(islice(_first_texts(data), SAMPLE_TEXTS))[:SAMPLE_CHAR_LIMIT]
+    if sample and not should_translate(sample, target_lang):
+        return data if inplace else _collect_translatable(data, [])
+
+    slots = []
+    translated_data = _collect_translatable(data, slots, inplace)
 
-    elif isinstance(data, list):
-        return [translate_selected_fields(item, target_lang) for item in data]
+    if slots:
+        texts = [container[key] for container, key in slots]
+        for (container, key), text in zip(slots, translate_batch(texts, target_lang)):
+            container[key] = text
 
-    return data
+    return translated_data